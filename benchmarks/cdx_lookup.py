@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+"""Measures lookups per second in a large sorted CDX file with CDXIndex.
+
+Writes a sorted CDX file of about --gb gigabytes (unless it already
+exists), made from the keys of the synthetic corpus of corpus.py with many
+captures per key, then times
+
+  exact     iter_exact() on keys that are in the file, all lines read
+  miss      iter_exact() on keys of another corpus, mostly not in the file
+  first     the first line of iter_exact(), as for a "closest" lookup
+  host      the first 1000 lines of lookup(url, 'host'), as for one page
+            of a host query
+
+The file is left in place for the next run; delete it to start over. The
+first run after writing the file measures a warm page cache. To measure
+cold lookups, drop the page cache between runs (as root on Linux:
+echo 3 > /proc/sys/vm/drop_caches).
+
+Usage: python benchmarks/cdx_lookup.py [--gb 4] [-f file] [-n lookups]
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import os
+import sys
+import time
+import random
+import argparse
+import itertools
+
+from surt.surt import surt_many
+from surt.cdxindex import CDXIndex
+
+from corpus import make_corpus
+
+_LINE = b'%s %d %s text/html 200 %s - - 2048 %d CC-MAIN-%05d.warc.gz\n'
+
+def write_cdx(path, gb, keys=1000000, seed=0):
+    """Writes a sorted CDX file of about gb gigabytes to path and returns
+    the sorted list of distinct (key, url) pairs it is made of."""
+    urls = [url for url in make_corpus(keys, seed)
+            if not url.startswith((b'filedesc', b'warcinfo'))]
+    pairs = sorted(set(zip(surt_many(urls), urls)))
+    line_len = (len(_LINE % (b'', 20150101000000, b'', b'A' * 32, 0, 0))
+                + sum(len(key) + len(url) for key, url in pairs) / len(pairs))
+    captures = max(1, int(gb * 1e9 / (len(pairs) * line_len)))
+    if not os.path.exists(path):
+        print('writing %s: %d keys x %d captures' % (
+            path, len(pairs), captures), file=sys.stderr)
+        rnd = random.Random(seed)
+        offset = 0
+        with open(path, 'wb') as f:
+            f.write(b' CDX N b a m s k r M S V g\n')
+            for key, url in pairs:
+                lines = []
+                for timestamp in sorted(rnd.randint(19960101000000, 20251231235959)
+                                        for _ in range(captures)):
+                    lines.append(_LINE % (key, timestamp, url, b'A' * 32,
+                                          offset, offset % 100000))
+                    offset += 2048
+                f.write(b''.join(lines))
+    return pairs
+
+def timed(name, func, items):
+    start = time.time()
+    lines = 0
+    for item in items:
+        lines += func(item)
+    elapsed = time.time() - start
+    print('%-8s %10.0f lookups/s %10.0f lines/s' % (
+        name, len(items) / elapsed, lines / elapsed))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+            description='Time CDXIndex lookups on a large sorted CDX file.')
+    parser.add_argument('--gb', type=float, default=4.0)
+    parser.add_argument('-f', '--file', default='benchmark-index.cdx')
+    parser.add_argument('-k', '--keys', type=int, default=1000000,
+                        help='number of corpus urls to make the keys of')
+    parser.add_argument('-n', '--lookups', type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    pairs = write_cdx(args.file, args.gb, args.keys)
+    rnd = random.Random(1)
+    hits = [key for key, _ in rnd.sample(pairs, min(args.lookups, len(pairs)))]
+    misses = surt_many([url for url in make_corpus(len(hits), seed=1)])
+    hosts = [url for _, url in rnd.sample(pairs, min(args.lookups // 10,
+                                                     len(pairs)))
+             if b'://' in url]
+
+    with CDXIndex(args.file) as index:
+        print('%s: %.2f GB, %d keys' % (args.file, index.size / 1e9,
+                                        len(pairs)))
+        timed('exact', lambda key: sum(1 for _ in index.iter_exact(key)), hits)
+        timed('miss', lambda key: sum(1 for _ in index.iter_exact(key)), misses)
+        timed('first', lambda key: len(next(iter(index.iter_exact(key)), b'')) and 1,
+              hits)
+        timed('host', lambda url: sum(1 for _ in itertools.islice(
+            index.lookup(url, 'host'), 1000)), hosts)
+
+if __name__ == '__main__':
+    main()
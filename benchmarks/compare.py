@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+"""Compares two result files written by stages.py.
+
+Prints the time per url of each stage in both files and the change. With
+--threshold, exits with status 1 if any stage got slower by more than
+that fraction, e.g. --threshold 0.1 for 10%.
+
+Usage: python benchmarks/compare.py [--threshold f] before.json after.json
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import sys
+import json
+import argparse
+
+def compare(before, after):
+    """Returns a list of (stage, before us/url, after us/url, change), where
+    change is the relative change of the time, e.g. 0.1 for 10% slower."""
+    rows = []
+    for name in after['stages']:
+        if name not in before['stages']:
+            continue
+        old = before['stages'][name]['us_per_url']
+        new = after['stages'][name]['us_per_url']
+        rows.append((name, old, new, new / old - 1 if old else 0.0))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+            description='Compare two stages.py result files.')
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=None,
+                        help='fail if a stage is slower by more than this '
+                             'fraction')
+    args = parser.parse_args(argv)
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    if (before['urls'], before['seed']) != (after['urls'], after['seed']):
+        print('warning: the runs used different corpora', file=sys.stderr)
+
+    print('%-14s %12s %12s %8s' % ('stage', before['revision'] or 'before',
+                                   after['revision'] or 'after', 'change'))
+    failed = []
+    for name, old, new, change in compare(before, after):
+        print('%-14s %9.2f us %9.2f us %+7.1f%%' % (name, old, new, change * 100))
+        if args.threshold is not None and change > args.threshold:
+            failed.append(name)
+
+    if failed:
+        print('slower than the threshold: %s' % ', '.join(failed),
+              file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
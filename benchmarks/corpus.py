@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Deterministic synthetic url corpus for the benchmarks.
+
+The mix is modelled on the urls found in web archive indexes: most urls
+are plain http(s) urls on a few popular hosts (host popularity follows a
+Pareto distribution), with a tail of
+
+  idn        internationalized host names, as utf-8 and as punycode
+  ip         numeric hosts: dotted quads, plain integers, octal
+  query      long queries with dozens of args, mixed case, repeated names
+  sessionid  jsessionid/phpsessid/sid/aspsessionid/cfid query args and
+             ASP.NET cookieless session ids in the path
+  escaped    percent-encoded paths, including double encoding and %2F
+  dotted     paths with ./, ../ and // segments
+  records    the filedesc:, dns: and warcinfo: records of WARC/ARC files
+
+make_corpus(n, seed) always returns the same list of bytes urls for the
+same arguments, so results from different revisions can be compared.
+
+Usage: python benchmarks/corpus.py [number-of-urls [seed]] > urls.txt
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import sys
+import random
+
+# (kind, weight)
+KINDS = [
+    ('plain', 60),
+    ('idn', 4),
+    ('ip', 3),
+    ('query', 10),
+    ('sessionid', 5),
+    ('escaped', 8),
+    ('dotted', 4),
+    ('records', 6),
+]
+
+_WORDS = ['index', 'news', 'archive', 'images', 'about', 'products', 'blog',
+          'search', 'Article', 'static', 'css', 'js', 'download', 'en', 'de',
+          'category', '2015', '07', 'item', 'view', 'page', 'user', 'Help']
+_EXTS = ['', '.html', '.htm', '.php', '.asp', '.aspx', '.jsp', '.jpg', '.png',
+         '.css', '.js', '.pdf', '/']
+_TLDS = ['com', 'org', 'net', 'de', 'co.uk', 'fr', 'jp', 'com.au', 'ru',
+         'edu', 'gov', 'info', 'it', 'nl', 'co.jp', 'blogspot.com']
+_IDN_LABELS = [u'b\xfccher', u'm\xfcnchen', u'例え', u'пример',
+               u'caf\xe9', u'مثال', u'stra\xdfe']
+_ALNUM = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+
+class _Generator(object):
+    def __init__(self, seed, hosts):
+        self.rnd = random.Random(seed)
+        rnd = self.rnd
+        self.hosts = []
+        for i in range(hosts):
+            name = '%s%d' % (rnd.choice(_WORDS).lower(), i)
+            prefix = rnd.choice(['www.', 'www.', 'www2.', '', '', 'm.',
+                                 'images.', 'WWW.'])
+            self.hosts.append(prefix + name + '.' + rnd.choice(_TLDS))
+
+    def host(self):
+        rnd = self.rnd
+        i = min(int(rnd.paretovariate(1.1)) - 1, len(self.hosts) - 1)
+        return self.hosts[i]
+
+    def scheme(self):
+        return self.rnd.choice(['http://'] * 6 + ['https://'] * 3
+                               + ['HTTP://'])
+
+    def path(self, depth=None):
+        rnd = self.rnd
+        if depth is None:
+            depth = rnd.randint(0, 5)
+        segments = [rnd.choice(_WORDS) for _ in range(depth)]
+        return '/' + '/'.join(segments) + rnd.choice(_EXTS)
+
+    def token(self, chars, n):
+        return ''.join(self.rnd.choice(chars) for _ in range(n))
+
+    def query(self, n):
+        rnd = self.rnd
+        args = []
+        for _ in range(n):
+            name = rnd.choice(_WORDS + ['id', 'q', 'utm_source', 'p', 'lang'])
+            if rnd.random() < 0.1:
+                args.append(name)
+            else:
+                args.append('%s=%s' % (name, self.token(_ALNUM, rnd.randint(1, 12))))
+        return '?' + '&'.join(args)
+
+    def plain(self):
+        rnd = self.rnd
+        url = self.scheme() + self.host()
+        if rnd.random() < 0.05:
+            url += ':' + rnd.choice(['80', '443', '8080'])
+        url += self.path()
+        if rnd.random() < 0.3:
+            url += self.query(rnd.randint(1, 4))
+        if rnd.random() < 0.05:
+            url += '#' + rnd.choice(_WORDS)
+        return url.encode('utf-8')
+
+    def idn(self):
+        rnd = self.rnd
+        label = rnd.choice(_IDN_LABELS)
+        host = '%s.site%d.%s' % (label, rnd.randint(0, 50), rnd.choice(_TLDS))
+        if rnd.random() < 0.3:
+            host = host.encode('idna').decode('ascii')
+        return (self.scheme() + host + self.path()).encode('utf-8')
+
+    def ip(self):
+        rnd = self.rnd
+        quad = [rnd.randint(1, 254) for _ in range(4)]
+        kind = rnd.random()
+        if kind < 0.8:
+            host = '%d.%d.%d.%d' % tuple(quad)
+        elif kind < 0.9:
+            host = '%d' % ((quad[0] << 24) | (quad[1] << 16)
+                           | (quad[2] << 8) | quad[3])
+        else:
+            host = '0%o.%d.%d.%d' % tuple(quad)
+        return ('http://' + host + self.path()).encode('ascii')
+
+    def long_query(self):
+        rnd = self.rnd
+        n = rnd.choice([10, 20, 50, 100, 200])
+        return (self.scheme() + self.host() + self.path()
+                + self.query(n)).encode('ascii')
+
+    def sessionid(self):
+        rnd = self.rnd
+        kind = rnd.randint(0, 5)
+        if kind == 0:
+            arg = 'jsessionid=' + self.token(_ALNUM, 32)
+        elif kind == 1:
+            arg = 'PHPSESSID=' + self.token(_ALNUM, 32)
+        elif kind == 2:
+            arg = 'sid=' + self.token('0123456789abcdef', 32)
+        elif kind == 3:
+            arg = 'ASPSESSIONID%s=%s' % (self.token('ABCDEFGHIJ', 8),
+                                         self.token('ABCDEFGHIJKLMNOP', 24))
+        elif kind == 4:
+            arg = 'CFID=%d&CFTOKEN=%d' % (rnd.randint(1, 10**8),
+                                          rnd.randint(1, 10**8))
+        else:
+            # ASP.NET cookieless session in the path
+            sid = self.token('abcdefghijklmnopqrstuvwxyz012345', 24)
+            return (self.scheme() + self.host() + '/(S(' + sid + '))/'
+                    + rnd.choice(_WORDS) + '.aspx').encode('ascii')
+        query = self.query(rnd.randint(0, 3))
+        if query == '?':
+            query = '?' + arg
+        else:
+            query = query + '&' + arg
+        return (self.scheme() + self.host() + self.path() + query).encode('ascii')
+
+    def escaped(self):
+        rnd = self.rnd
+        segments = []
+        for _ in range(rnd.randint(1, 4)):
+            word = rnd.choice(_WORDS)
+            kind = rnd.randint(0, 4)
+            if kind == 0:
+                word = word + '%20' + rnd.choice(_WORDS)
+            elif kind == 1:
+                word = '%7E' + word
+            elif kind == 2:
+                word = word + '%2525' + rnd.choice(_WORDS)
+            elif kind == 3:
+                word = word + '%2F' + rnd.choice(_WORDS)
+            else:
+                word = word + '%C3%BC%C3%9F'
+            segments.append(word)
+        url = self.scheme() + self.host() + '/' + '/'.join(segments)
+        if rnd.random() < 0.3:
+            url += '?q=' + rnd.choice(_WORDS) + '%26' + rnd.choice(_WORDS)
+        return url.encode('ascii')
+
+    def dotted(self):
+        rnd = self.rnd
+        segments = []
+        for _ in range(rnd.randint(2, 8)):
+            segments.append(rnd.choice(_WORDS + ['.', '..', '']))
+        return (self.scheme() + self.host() + '/' + '/'.join(segments)
+                + rnd.choice(_EXTS)).encode('ascii')
+
+    def records(self):
+        rnd = self.rnd
+        kind = rnd.randint(0, 2)
+        if kind == 0:
+            return ('filedesc://IA-%d-%05d.arc.gz' % (
+                rnd.randint(10**13, 10**14), rnd.randint(0, 99999))).encode('ascii')
+        elif kind == 1:
+            return ('dns:' + self.host()).encode('ascii')
+        return ('warcinfo:/CC-MAIN-%05d.warc.gz' % rnd.randint(0, 99999)).encode('ascii')
+
+def make_corpus(n, seed=0, hosts=10000):
+    """Returns a list of n bytes urls, the same for the same arguments."""
+    gen = _Generator(seed, hosts)
+    makers = {
+        'plain': gen.plain,
+        'idn': gen.idn,
+        'ip': gen.ip,
+        'query': gen.long_query,
+        'sessionid': gen.sessionid,
+        'escaped': gen.escaped,
+        'dotted': gen.dotted,
+        'records': gen.records,
+    }
+    kinds = []
+    for kind, weight in KINDS:
+        kinds += [kind] * weight
+    return [makers[gen.rnd.choice(kinds)]() for _ in range(n)]
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    n = int(argv[0]) if argv else 100000
+    seed = int(argv[1]) if len(argv) > 1 else 0
+    out = getattr(sys.stdout, 'buffer', sys.stdout)
+    for url in make_corpus(n, seed):
+        out.write(url + b'\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+"""Measures the memory held by parsed handyurl instances with tracemalloc.
+
+Compares, in bytes per parsed url:
+
+  dict      an equivalent object with a per-instance __dict__ (the layout
+            handyurl had before it got __slots__)
+  slots     handyurl as it is now
+  interned  handyurl.parse(url, intern_table=...) sharing scheme and host
+
+Usage: python benchmarks/handyurl_memory.py [number-of-urls]
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import sys
+import random
+import tracemalloc
+
+from surt.handyurl import handyurl
+
+class DictHandyurl(object):
+    """handyurl's attributes without __slots__"""
+    def __init__(self, h):
+        for name in handyurl.__slots__:
+            setattr(self, name, getattr(h, name))
+
+def make_urls(n, hosts=2000, seed=0):
+    rnd = random.Random(seed)
+    host_names = ['www%d.site%d.example.com' % (i % 3, i) for i in range(hosts)]
+    urls = []
+    for i in range(n):
+        host = host_names[min(int(rnd.paretovariate(1.2)) - 1, hosts - 1)]
+        urls.append(('http://%s/dir%d/page%d.html?id=%d' % (
+            host, rnd.randint(0, 50), i, rnd.randint(0, 10**6))).encode('ascii'))
+    return urls
+
+def measure(urls, make):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = make(urls)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(kept) == len(urls)
+    return (after - before) / len(urls)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    n = int(argv[0]) if argv else 200000
+    urls = make_urls(n)
+
+    results = [
+        ('dict', measure(urls, lambda urls: [
+            DictHandyurl(handyurl.parse(url)) for url in urls])),
+        ('slots', measure(urls, lambda urls: [
+            handyurl.parse(url) for url in urls])),
+    ]
+    table = {}
+    results.append(('interned', measure(urls, lambda urls: [
+        handyurl.parse(url, intern_table=table) for url in urls])))
+
+    print('%d urls' % n)
+    for name, per_url in results:
+        print('%-10s %8.1f bytes/url' % (name, per_url))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+"""Compares registered domain lookups in surt.publicsuffix with tldextract.
+
+Reports microseconds per host for:
+
+  tldextract   tldextract.extract(host).registered_domain, on the snapshot
+               of the list that ships with tldextract (no network)
+  trie         PublicSuffixList.registered_domain() without memoization
+  memoized     PublicSuffixList.registered_domain() with its cache warm
+  surt         surt(url, public_suffix=True) vs surt(url), per url
+
+Usage: python benchmarks/public_suffix.py [number-of-hosts]
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import sys
+import time
+import random
+
+from surt import surt
+from surt.publicsuffix import PublicSuffixList, get_public_suffix_list
+
+def make_hosts(n, distinct=5000, seed=0):
+    rnd = random.Random(seed)
+    suffixes = ['com', 'org', 'net', 'co.uk', 'ac.uk', 'de', 'fr', 'com.au',
+                'co.jp', 'city.kawasaki.jp', 'gov.br', 'ck', 'blogspot.com']
+    names = []
+    for i in range(distinct):
+        labels = ['www', 'img%d' % (i % 7), 'a.b'][:rnd.randint(0, 3)]
+        names.append('.'.join(labels + ['site%d' % i, rnd.choice(suffixes)]))
+    return [names[min(int(rnd.paretovariate(1.2)) - 1, distinct - 1)]
+            for _ in range(n)]
+
+def per_item(func, items):
+    start = time.time()
+    for item in items:
+        func(item)
+    return (time.time() - start) / len(items) * 1e6
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    n = int(argv[0]) if argv else 100000
+    hosts = make_hosts(n)
+    bhosts = [host.encode('ascii') for host in hosts]
+
+    results = []
+    try:
+        import tldextract
+    except ImportError:
+        print('tldextract is not installed, skipping it')
+    else:
+        extract = tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None)
+        extract('warm.up.example.com')
+        results.append(('tldextract', per_item(
+            lambda host: extract(host).registered_domain, hosts)))
+
+    psl = get_public_suffix_list()
+    uncached = PublicSuffixList([])
+    uncached._root = psl._root
+    results.append(('trie', per_item(
+        lambda host: uncached._split(host), bhosts)))
+    psl.registered_domain(b'warm.up.example.com')
+    for host in bhosts:
+        psl.registered_domain(host)
+    results.append(('memoized', per_item(psl.registered_domain, bhosts)))
+
+    urls = [b'http://' + host + b'/index.html' for host in bhosts]
+    results.append(('surt', per_item(surt, urls)))
+    results.append(('surt+psl', per_item(
+        lambda url: surt(url, public_suffix=True), urls)))
+
+    print('%d hosts' % n)
+    for name, us in results:
+        print('%-12s %8.2f us' % (name, us))
+
+if __name__ == '__main__':
+    main()
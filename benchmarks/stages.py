@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+
+"""Times the stages of surt() on the synthetic corpus of corpus.py.
+
+Stages, each timed on its own over the whole corpus:
+
+  parse         handyurl.parse()
+  google        GoogleURLCanonicalizer.canonicalize() on parsed urls
+  ia            IAURLCanonicalizer.canonicalize() on google-canonicalized urls
+  geturl_bytes  handyurl.geturl_bytes(surt=True) on canonicalized urls
+  surt          surt() end to end, as bytes
+  surt_nocache  surt() end to end with host_cache=None
+
+The host steps use default_host_cache, as surt() does; it is cleared
+before each round so that every round starts out cold. Revisions without
+the host cache run the same stages without it. Each stage is run for a
+number of rounds and the fastest round is reported.
+
+The surt package timed is the one of the checkout this script is in, or
+of the tree given with --surt-path, never an installed one. The results
+are written as JSON (to stdout, or to the -o file) so that runs on two
+revisions can be compared with compare.py. As this script may not exist
+in older revisions, check those out in a worktree of their own:
+
+  git worktree add /tmp/surt-old <revision>
+  python benchmarks/stages.py --surt-path /tmp/surt-old -o before.json
+  python benchmarks/stages.py -o after.json
+  python benchmarks/compare.py before.json after.json
+
+Usage: python benchmarks/stages.py [-n urls] [--seed n] [--rounds n]
+                                   [--surt-path dir] [-o file]
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+
+from corpus import make_corpus
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# set by _load_surt()
+surt = handyurl = GoogleURLCanonicalizer = IAURLCanonicalizer = None
+default_host_cache = None
+
+def _load_surt(path):
+    """Imports the surt package of the tree at path. Older revisions
+    lack the host cache; the canonicalizers of every revision ignore a
+    host_cache=None they don't know."""
+    global surt, handyurl, GoogleURLCanonicalizer, IAURLCanonicalizer
+    global default_host_cache
+    sys.path.insert(0, os.path.abspath(path))
+    import surt
+    from surt import handyurl
+    import surt.GoogleURLCanonicalizer as GoogleURLCanonicalizer
+    import surt.IAURLCanonicalizer as IAURLCanonicalizer
+    try:
+        from surt.hostcache import default_host_cache
+    except ImportError:
+        default_host_cache = None
+    return surt
+
+def _clear_cache():
+    if default_host_cache is not None:
+        default_host_cache.clear()
+
+def _parse_all(urls):
+    return [handyurl.parse(url) for url in urls]
+
+def _google_all(urls):
+    return [GoogleURLCanonicalizer.canonicalize(
+        h, host_cache=default_host_cache) for h in _parse_all(urls)]
+
+def _ia_all(urls):
+    return [IAURLCanonicalizer.canonicalize(
+        h, host_cache=default_host_cache) for h in _google_all(urls)]
+
+# name -> (prepare(urls) -> inputs, run(inputs)). prepare() is not timed.
+STAGES = [
+    ('parse', (
+        lambda urls: urls,
+        lambda urls: [handyurl.parse(url) for url in urls])),
+    ('google', (
+        _parse_all,
+        lambda hs: [GoogleURLCanonicalizer.canonicalize(
+            h, host_cache=default_host_cache) for h in hs])),
+    ('ia', (
+        _google_all,
+        lambda hs: [IAURLCanonicalizer.canonicalize(
+            h, host_cache=default_host_cache) for h in hs])),
+    ('geturl_bytes', (
+        _ia_all,
+        lambda hs: [h.geturl_bytes(surt=True, host_cache=default_host_cache)
+                    for h in hs])),
+    ('surt', (
+        lambda urls: urls,
+        lambda urls: [surt.surt(url) for url in urls])),
+    ('surt_nocache', (
+        lambda urls: urls,
+        lambda urls: [surt.surt(url, host_cache=None) for url in urls])),
+]
+
+def run_stage(prepare, run, urls, rounds):
+    """Returns the seconds taken by the fastest of rounds runs."""
+    best = None
+    for _ in range(rounds):
+        # canonicalize() changes the handyurls, so every round gets fresh ones
+        _clear_cache()
+        inputs = prepare(urls)
+        _clear_cache()
+        start = time.perf_counter()
+        run(inputs)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def _git_revision(path):
+    try:
+        out = subprocess.check_output(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=path,
+                stderr=subprocess.STDOUT)
+        return out.decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+            description='Time the stages of surt() on a synthetic corpus.')
+    parser.add_argument('-n', '--urls', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--stage', action='append', dest='stages',
+                        choices=[name for name, _ in STAGES],
+                        help='only run this stage (may be repeated)')
+    parser.add_argument('--surt-path', default=REPO_ROOT,
+                        help='tree of the surt package to time (default: '
+                             'this checkout)')
+    parser.add_argument('-o', '--output', help='write JSON here (default: stdout)')
+    args = parser.parse_args(argv)
+
+    loaded = _load_surt(args.surt_path)
+    print('timing %s' % os.path.dirname(loaded.__file__), file=sys.stderr)
+    urls = make_corpus(args.urls, args.seed)
+
+    results = {
+        'revision': _git_revision(args.surt_path),
+        'host_cache': default_host_cache is not None,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'urls': args.urls,
+        'seed': args.seed,
+        'rounds': args.rounds,
+        'stages': {},
+    }
+    for name, (prepare, run) in STAGES:
+        if args.stages and name not in args.stages:
+            continue
+        seconds = run_stage(prepare, run, urls, args.rounds)
+        results['stages'][name] = {
+            'seconds': seconds,
+            'us_per_url': seconds / len(urls) * 1e6,
+            'urls_per_second': len(urls) / seconds if seconds else None,
+        }
+        print('%-14s %8.2f us/url %10.0f urls/s' % (
+            name, seconds / len(urls) * 1e6, len(urls) / seconds),
+            file=sys.stderr)
+
+    data = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(data + '\n')
+    else:
+        print(data)
+
+if __name__ == '__main__':
+    main()
@@ -20,18 +20,25 @@ setup(name='surt',
       author_email='raj@archive.org',
       classifiers=[
         'License :: OSI Approved :: GNU Affero General Public License v3',
+        'Programming Language :: Python :: 3',
       ],
       description='Sort-friendly URI Reordering Transform (SURT) python package.',
       long_description=open('README.rst').read(),
       url='https://github.com/internetarchive/surt',
       zip_safe=True,
-      install_requires=[
-          'six',
-          'tldextract>=2.0',
-      ],
+      python_requires='>=3.6',
+      install_requires=[],
       provides=[ 'surt' ],
       packages=[ 'surt' ],
+      package_data={ 'surt': [ 'public_suffix_list.dat' ] },
       scripts=[],
+      entry_points={
+          'console_scripts': [
+              'surt-cdx = surt.cdx:main',
+              'surt-zipnum = surt.zipnum:main',
+              'surt-sort = surt.sort:main',
+          ],
+      },
       # Tests
       tests_require=[ 'pytest', 'pytest-cov' ],
       test_suite='',
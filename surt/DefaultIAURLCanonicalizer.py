@@ -30,11 +30,26 @@ import surt.IAURLCanonicalizer
 
 # canonicalize()
 #_______________________________________________________________________________
-def canonicalize(url, **options):
+def canonicalize(url, stage_timer=None, **options):
     """The input url is a handyurl instance
     """
+    if stage_timer is not None:
+        return _canonicalizeTimed(url, stage_timer, options)
 
     url = surt.GoogleURLCanonicalizer.canonicalize(url, **options)
     url = surt.IAURLCanonicalizer.canonicalize(url, **options)
 
     return url
+
+def _canonicalizeTimed(url, timer, options):
+    clock = timer.clock
+    start = clock()
+    url = surt.GoogleURLCanonicalizer.canonicalize(
+            url, stage_timer=timer, **options)
+    t = clock()
+    timer.record('google', t - start)
+    url = surt.IAURLCanonicalizer.canonicalize(
+            url, stage_timer=timer, **options)
+    timer.record('ia', clock() - t)
+
+    return url
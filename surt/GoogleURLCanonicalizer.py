@@ -27,57 +27,100 @@ http://archive-access.svn.sourceforge.net/viewvc/archive-access/trunk/archive-ac
 from __future__ import absolute_import
 
 import re
-import struct
-import socket
-import encodings.idna
 
 from surt.handyurl import handyurl
 
 try:
-    from urllib.parse import quote_from_bytes, unquote_to_bytes
-except:
-    from urllib import quote as quote_from_bytes, unquote as unquote_to_bytes
-from six import text_type, binary_type
+    from urllib.parse import unquote_to_bytes
+except ImportError:
+    from urllib import unquote as unquote_to_bytes
 
 # canonicalize()
 #_______________________________________________________________________________
-def canonicalize(url, **_ignored):
-    url.hash = None
+def canonicalize(url, host_resolve_ip=False, host_cache=None,
+                 stage_timer=None, **_ignored):
+    if stage_timer is not None:
+        return _canonicalizeTimed(url, host_resolve_ip, host_cache,
+                                  stage_timer)
+
+    canonicalizeHostPart(url, host_resolve_ip, host_cache)
+    canonicalizeQueryPart(url)
+    canonicalizePathPart(url)
+    return url
+
+def _canonicalizeTimed(url, host_resolve_ip, host_cache, timer):
+    """canonicalize() with its steps timed by the StageTimer timer"""
+    clock = timer.clock
+    start = clock()
+    canonicalizeHostPart(url, host_resolve_ip, host_cache)
+    t = clock()
+    timer.record('google.host', t - start)
+    canonicalizeQueryPart(url)
+    start, t = t, clock()
+    timer.record('google.query', t - start)
+    canonicalizePathPart(url)
+    timer.record('google.path', clock() - t)
+    return url
+
+# canonicalizeHostPart()
+#_______________________________________________________________________________
+def canonicalizeHostPart(url, host_resolve_ip=False, host_cache=None,
+                         **_ignored):
+    """The steps of canonicalize() for the user info and the host of the
+    handyurl url, which is changed in place and returned"""
     if url.authUser:
         url.authUser = minimalEscape(url.authUser)
     if url.authPass:
         url.authPass = minimalEscape(url.authPass)
-    if url.query:
-        url.query = minimalEscape(url.query)
 
     if url.host:
-        host = unescapeRepeatedly(url.host)
-        try:
-            host.decode('ascii')
-        except UnicodeDecodeError:
-            try:
-                host = host.decode('utf-8', 'ignore').encode('idna')
-            except ValueError:
-                pass
-
-        host = host.replace(b'..', b'.').strip(b'.')
-
-        ip = attemptIPFormats(host)
-        if ip:
-            host = ip;
+        if host_cache is not None:
+            url.host = host_cache.call(
+                    canonicalizeHost, url.host, host_resolve_ip)
         else:
-            host = escapeOnce(host.lower())
+            url.host = canonicalizeHost(url.host, host_resolve_ip)
+    return url
 
-        url.host = host
+# canonicalizeQueryPart()
+#_______________________________________________________________________________
+def canonicalizeQueryPart(url):
+    """The steps of canonicalize() for the query and the fragment"""
+    url.hash = None
+    if url.query:
+        url.query = minimalEscape(url.query)
+    return url
 
+# canonicalizePathPart()
+#_______________________________________________________________________________
+def canonicalizePathPart(url):
+    """The steps of canonicalize() for the path"""
     path = unescapeRepeatedly(url.path)
     if url.host:
         path = normalizePath(path)
     # else path is free-form sort of thing, not /directory/thing
     url.path = escapeOnce(path)
-
     return url
 
+# canonicalizeHost()
+#_______________________________________________________________________________
+def canonicalizeHost(host, resolve_ip=False):
+    host = unescapeRepeatedly(host)
+    try:
+        host.decode('ascii')
+    except UnicodeDecodeError:
+        try:
+            host = host.decode('utf-8', 'ignore').encode('idna')
+        except ValueError:
+            pass
+
+    host = host.replace(b'..', b'.').strip(b'.')
+
+    ip = attemptIPFormats(host, resolve_ip)
+    if ip:
+        return ip
+    else:
+        return escapeOnce(host.lower())
+
 # normalizePath()
 #_______________________________________________________________________________
 
@@ -85,74 +128,146 @@ def normalizePath(path):
     if not path:
         return b'/'
 
+    # the common case: no empty, '.' or '..' segments to deal with
+    if path[:1] == b'/' and b'//' not in path and b'/.' not in path:
+        return path
+
     #gives an empty trailing element if path ends with '/':
     paths       = path.split(b'/')
     keptPaths   = []
-    first       = True
+
+    # the first element is whatever comes before the first '/'; skip it
+    paths[0] = b'.'
 
     for p in paths:
-        if first:
-            first = False
-            continue
-        elif b'.' == p:
+        if b'.' == p:
             # skip
             continue
         elif b'..' == p:
             #pop the last path, if present:
-            if len(keptPaths) > 0:
-                keptPaths = keptPaths[:-1]
+            if keptPaths:
+                keptPaths.pop()
             else:
                 # TODO: leave it? let's do for now...
                 keptPaths.append(p)
         else:
             keptPaths.append(p)
 
-    path = b'/'
-
-    # If the path ends in '/', then the last element of keptPaths will be ''
-    # Since we add a trailing '/' after the second-to-last element of keptPaths
-    # in the for loop below, the trailing slash is preserved.
-    numKept = len(keptPaths)
-    if numKept > 0:
-        for i in range(0, numKept-1):
-            p = keptPaths[i]
-            if len(p) > 0:
-                #this will omit multiple slashes:
-                path += p + b'/'
-        path += keptPaths[numKept-1]
+    # Empty elements are dropped (this omits multiple slashes), except for
+    # the last one: if the path ends in '/', the last element is '' and the
+    # trailing slash is preserved.
+    if b'' in keptPaths and keptPaths.index(b'') < len(keptPaths) - 1:
+        last = keptPaths.pop()
+        keptPaths = [p for p in keptPaths if p]
+        keptPaths.append(last)
 
-    return path
+    return b'/' + b'/'.join(keptPaths)
 
 OCTAL_IP = re.compile(br"^(0[0-7]*)(\.[0-7]+)?(\.[0-7]+)?(\.[0-7]+)?$")
 DECIMAL_IP = re.compile(br"^([1-9][0-9]*)(\.[0-9]+)?(\.[0-9]+)?(\.[0-9]+)?$")
 
 # attemptIPFormats()
 #_______________________________________________________________________________
-def attemptIPFormats(host):
+def attemptIPFormats(host, resolve=False):
+    """Returns the dotted-quad form of host if it is a numeric ipv4 address,
+    otherwise None.
+
+    Addresses are parsed in process by parseIPv4(). With resolve=True they
+    are looked up with socket.gethostbyname_ex() instead, as older versions
+    did; that is a blocking resolver call which may go out to DNS for
+    strings that are not valid addresses.
+    """
     if None == host:
         return None
 
     if host.isdigit():
         #mask hostname to lower four bytes to workaround issue with liveweb arc files
-        return socket.inet_ntoa(
-                struct.pack('>L', int(host) & 0xffffffff)).encode('ascii')
+        return _formatIPv4(int(host) & 0xffffffff)
     else:
         m = DECIMAL_IP.match(host)
         if m:
-            try:
-                return socket.gethostbyname_ex(host)[2][0].encode('ascii')
-            except (socket.gaierror, socket.herror):
-                return None
+            if not resolve:
+                return _formatIPv4(parseIPv4(host))
+            return _gethostbyname(host)
         else:
             m = OCTAL_IP.match(host)
             if m:
-                try:
-                    return socket.gethostbyname_ex(host)[2][0].encode('ascii')
-                except socket.gaierror:
-                    return None
+                if not resolve:
+                    return _formatIPv4(parseIPv4(host))
+                return _gethostbyname(host)
 
     return None
 
+# parseIPv4()
+#_______________________________________________________________________________
+_IPV4_LAST_PART_MAX = (0xffffffff, 0xffffff, 0xffff, 0xff)
+
+def parseIPv4(host):
+    """Parses host the way inet_aton(3) does and returns the address as an
+    int, or None if host is not an ipv4 address.
+
+    Accepts one to four dot-separated parts, each of them decimal, octal
+    (leading 0) or hex (leading 0x). The last part fills all of the
+    remaining bytes, so "10.0.258" is 10.0.1.2 and "3279880203" is
+    195.127.0.11. Like inet_aton, parsing stops at the first whitespace
+    character after the address.
+    """
+    if not host or not host[:1].isdigit():
+        return None
+    host = host.split(None, 1)[0]
+
+    parts = host.split(b'.')
+    if len(parts) > 4:
+        return None
+
+    addr = 0
+    for i, part in enumerate(parts):
+        if not part[:1].isdigit():
+            return None
+        try:
+            if part[:2] in (b'0x', b'0X'):
+                value = int(part[2:], 16) if _isHex(part[2:]) else None
+            elif part[:1] == b'0':
+                value = int(part, 8)
+            elif part.isdigit():
+                value = int(part)
+            else:
+                value = None
+        except ValueError:
+            return None
+        if value is None:
+            return None
+
+        if i < len(parts) - 1:
+            if value > 0xff:
+                return None
+            addr |= value << (24 - 8 * i)
+        else:
+            if value > _IPV4_LAST_PART_MAX[i]:
+                return None
+            addr |= value
+
+    return addr
+
+def _gethostbyname(host):
+    # socket is only needed for this, so don't import it up front
+    import socket
+    try:
+        return socket.gethostbyname_ex(host)[2][0].encode('ascii')
+    except (socket.gaierror, socket.herror):
+        return None
+
+_HEX_DIGITS = frozenset(b'0123456789abcdefABCDEF')
+
+def _isHex(s):
+    return bool(s) and all(c in _HEX_DIGITS for c in bytearray(s))
+
+def _formatIPv4(addr):
+    if addr is None:
+        return None
+    return ('%d.%d.%d.%d' % (addr >> 24, (addr >> 16) & 0xff,
+                             (addr >> 8) & 0xff, addr & 0xff)).encode('ascii')
+
 
 # minimalEscape()
 #_______________________________________________________________________________
@@ -161,12 +276,24 @@ def minimalEscape(input):
 
 # escapeOnce()
 #_______________________________________________________________________________
+# Bytes that escapeOnce() leaves alone: printable ascii other than '#' and '%'.
+# This is what quote_from_bytes() does with safe='!"$&\'()*+,-./:;<=>?@[\]^_`{|}~'
+_ESCAPE_SAFE = bytes(bytearray(
+    c for c in range(0x21, 0x7f) if c not in bytearray(b'#%')))
+_ESCAPE_TABLE = [b'%%%02X' % c if c not in bytearray(_ESCAPE_SAFE)
+                 else bytes(bytearray([c])) for c in range(256)]
+_RE_ESCAPE_RUN = re.compile(br'[^!"$&-~]+')
+
+def _escapeRun(m):
+    return b''.join([_ESCAPE_TABLE[c] for c in bytearray(m.group())])
+
 def escapeOnce(input):
     """escape everything outside of 32-128, except #"""
     if input:
-        return quote_from_bytes(
-                input, safe=b'''!"$&'()*+,-./:;<=>?@[\]^_`{|}~''').encode(
-                        'ascii')
+        # the common case: nothing to escape
+        if not input.translate(None, _ESCAPE_SAFE):
+            return input
+        return _RE_ESCAPE_RUN.sub(_escapeRun, input)
     else:
         return input
 
@@ -178,9 +305,13 @@ def unescapeRepeatedly(input):
     if None == input:
         return None
 
-    while True:
+    if not isinstance(input, bytes):
+        input = input.encode('utf-8')
+
+    while b'%' in input:
         un = unquote_to_bytes(input)
         if un == input:
             return input
         input = un
 
+    return input
@@ -26,6 +26,7 @@ http://archive-access.svn.sourceforge.net/viewvc/archive-access/trunk/archive-ac
 from __future__ import absolute_import
 
 import re
+import operator
 
 from surt.handyurl import handyurl
 from surt.URLRegexTransformer import stripPathSessionID, stripQuerySessionID
@@ -39,60 +40,151 @@ def canonicalize(url, host_lowercase=True, host_massage=True,
                  path_strip_trailing_slash_unless_empty=True,
                  query_lowercase=True, query_strip_session_id=True,
                  query_strip_empty=True, query_alpha_reorder=True,
-                 hash_strip=True, **_ignored):
+                 hash_strip=True, host_cache=None, stage_timer=None,
+                 **_ignored):
     """The input url is a handyurl instance"""
-    if host_lowercase and url.host:
-        url.host = url.host.lower()
+    if stage_timer is not None:
+        return _canonicalizeTimed(
+                url, stage_timer,
+                (host_lowercase, host_massage, auth_strip_user,
+                 auth_strip_pass, port_strip_default, host_cache),
+                (path_strip_empty, path_lowercase, path_strip_session_id,
+                 path_strip_trailing_slash_unless_empty),
+                (query_strip_session_id, query_lowercase, query_alpha_reorder,
+                 query_strip_empty))
+
+    canonicalizeHostPart(url, host_lowercase, host_massage, auth_strip_user,
+                         auth_strip_pass, port_strip_default, host_cache)
+    canonicalizePathPart(url, path_strip_empty, path_lowercase,
+                         path_strip_session_id,
+                         path_strip_trailing_slash_unless_empty)
+    canonicalizeQueryPart(url, query_strip_session_id, query_lowercase,
+                          query_alpha_reorder, query_strip_empty)
+    return url
+
+def _canonicalizeTimed(url, timer, host_args, path_args, query_args):
+    """canonicalize() with its steps timed by the StageTimer timer; the
+    args are those of the canonicalize*Part() steps"""
+    clock = timer.clock
+    start = clock()
+    canonicalizeHostPart(url, *host_args)
+    t = clock()
+    timer.record('ia.host', t - start)
+    canonicalizePathPart(url, *path_args)
+    start, t = t, clock()
+    timer.record('ia.path', t - start)
+    canonicalizeQueryPart(url, *query_args)
+    timer.record('ia.query', clock() - t)
+    return url
 
-    if host_massage and url.host and (url.scheme != b'dns'): ###java version calls massageHost regardless of scheme
-        url.host = massageHost(url.host)
+# canonicalizeHostPart()
+#_______________________________________________________________________________
+def canonicalizeHostPart(url, host_lowercase=True, host_massage=True,
+                         auth_strip_user=True, auth_strip_pass=True,
+                         port_strip_default=True, host_cache=None,
+                         **_ignored):
+    """The steps of canonicalize() for the host, the user info and the
+    port of the handyurl url, which is changed in place and returned"""
+    if url.host:
+        ###java version calls massageHost regardless of scheme
+        massage = host_massage and url.scheme != b'dns'
+        if host_cache is not None:
+            url.host = host_cache.call(
+                    canonicalizeHost, url.host, host_lowercase, massage)
+        else:
+            url.host = canonicalizeHost(url.host, host_lowercase, massage)
 
     if auth_strip_user:
         url.authUser = None
         url.authPass = None
     elif auth_strip_pass:
-        url.arthPass = None
+        url.authPass = None
 
     if port_strip_default and url.scheme:
         defaultPort = getDefaultPort(url.scheme)
         if url.port == defaultPort:
             url.port = handyurl.DEFAULT_PORT
+    return url
 
-    path = url.path
-    if path_strip_empty and b'/' == path:
-        url.path = None
-    else:
-        if path_lowercase and path:
-            path = path.lower()
-        if path_strip_session_id and path:
-            path = stripPathSessionID(path)
-        if path_strip_empty and b'/' == path:
-            path = None
-        if path_strip_trailing_slash_unless_empty and path:
-            if path.endswith(b'/') and len(path)>1:
-                path = path[:-1]
-
-        url.path = path
-
-    query = url.query
-    if query:
-        if len(query) > 0:
-            if query_strip_session_id:
-                query = stripQuerySessionID(query)
-            if query_lowercase:
-                query = query.lower()
-            if query_alpha_reorder:
-                query = alphaReorderQuery(query)
-        if b'' == query and query_strip_empty:
-            query = None
-        url.query = query
-    else:
-        if query_strip_empty:
-            url.last_delimiter = None
+# canonicalizePathPart()
+#_______________________________________________________________________________
+def canonicalizePathPart(url, path_strip_empty=False, path_lowercase=True,
+                         path_strip_session_id=True,
+                         path_strip_trailing_slash_unless_empty=True,
+                         **_ignored):
+    """The steps of canonicalize() for the path"""
+    url.path = canonicalizePath(url.path, path_strip_empty, path_lowercase,
+                                path_strip_session_id,
+                                path_strip_trailing_slash_unless_empty)
+    return url
 
+# canonicalizeQueryPart()
+#_______________________________________________________________________________
+def canonicalizeQueryPart(url, query_strip_session_id=True,
+                          query_lowercase=True, query_alpha_reorder=True,
+                          query_strip_empty=True, **_ignored):
+    """The steps of canonicalize() for the query"""
+    if url.query:
+        url.query = canonicalizeQuery(url.query, query_strip_session_id,
+                                      query_lowercase, query_alpha_reorder,
+                                      query_strip_empty)
+    elif query_strip_empty:
+        url.last_delimiter = None
     return url
 
 
+# canonicalizeHost()
+#_______________________________________________________________________________
+def canonicalizeHost(host, host_lowercase=True, host_massage=True):
+    if host_lowercase:
+        host = host.lower()
+    if host_massage:
+        host = massageHost(host)
+    return host
+
+
+# canonicalizePath()
+#_______________________________________________________________________________
+def canonicalizePath(path, path_strip_empty=False, path_lowercase=True,
+                     path_strip_session_id=True,
+                     path_strip_trailing_slash_unless_empty=True):
+    if path_strip_empty and b'/' == path:
+        return None
+
+    if path_lowercase and path:
+        path = path.lower()
+    if path_strip_session_id and path:
+        path = stripPathSessionID(path)
+    if path_strip_empty and b'/' == path:
+        path = None
+    if path_strip_trailing_slash_unless_empty and path:
+        if path.endswith(b'/') and len(path)>1:
+            path = path[:-1]
+
+    return path
+
+
+# canonicalizeQuery()
+#_______________________________________________________________________________
+def canonicalizeQuery(query, query_strip_session_id=True, query_lowercase=True,
+                      query_alpha_reorder=True, query_strip_empty=True):
+    """query must not be empty
+
+    Session ids are stripped from the query string as a whole, since their
+    patterns may span several args. After that the query is split into its
+    args once, sorted, and joined back in one go.
+    """
+    if query_strip_session_id:
+        query = stripQuerySessionID(query)
+    if query_lowercase:
+        query = query.lower()
+    if query_alpha_reorder and b'&' in query:
+        query = b'&'.join(sorted(query.split(b'&'), key=_argKey))
+    if b'' == query and query_strip_empty:
+        query = None
+    return query
+
+
 # alphaReorderQuery()
 #_______________________________________________________________________________
 def alphaReorderQuery(orig):
@@ -108,18 +200,13 @@ def alphaReorderQuery(orig):
     if len(orig) <= 1:
         return orig
 
-    args = orig.split(b'&')
-    qas = [tuple(arg.split(b'=', 1)) for arg in args]
-    qas.sort()
-
-    s = b''
-    for t in qas:
-        if 1 == len(t):
-            s += t[0] + b'&'
-        else:
-            s += t[0] + b'=' + t[1] + b'&'
+    return b'&'.join(sorted(orig.split(b'&'), key=_argKey))
 
-    return s[:-1] #remove last &
+# Sorts args the way the (name,) and (name, value) tuples of
+# arg.split(b'=', 1) sort: "foo" < "foo=" < "foo=bar". Since the parts of
+# arg.partition(b'=') add up to the arg itself, the sorted args can be
+# joined as they are.
+_argKey = operator.methodcaller('partition', b'=')
 
 
 # massageHost()
@@ -24,6 +24,30 @@ http://archive-access.svn.sourceforge.net/viewvc/archive-access/trunk/archive-ac
 """
 
 import re
+from bisect import bisect_left
+
+# The session id patterns below are matched by hand: the regexes, which
+# are kept as the reference and for the odd input with a newline in it,
+# backtrack badly on long queries and paths. All of the patterns are
+# case-insensitive, so the scanners look at a lowercased copy and slice the
+# original.
+_ALNUM = b'0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+_ALPHA = b'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+def _runEnd(s, start, chars, n):
+    """Returns start + n if s[start:start+n] is n bytes out of chars, else -1"""
+    run = s[start:start + n]
+    if len(run) == n and not run.translate(None, chars):
+        return start + n
+    return -1
+
+def _positions(s, sub):
+    positions = []
+    i = s.find(sub)
+    while i >= 0:
+        positions.append(i)
+        i = s.find(sub, i + 1)
+    return positions
 
 # stripPathSessionID
 #_______________________________________________________________________________
@@ -36,6 +60,18 @@ def stripPathSessionID(path):
     """It looks like the java version returns a lowercased path..
     So why does it uses a case-insensitive regex? We won't lowercase here.
     """
+    if b'(' not in path:
+        return path
+    if b'\n' in path:
+        return _stripPathSessionIDRegex(path)
+    if b'.aspx' not in path.lower():
+        return path
+
+    path = _stripAspxSessionID(path, _aspxSessionIDsEnd)
+    path = _stripAspxSessionID(path, _aspxSessionIDEnd)
+    return path
+
+def _stripPathSessionIDRegex(path):
     for pattern in _RES_PATH_SESSIONID:
         m = pattern.match(path)
         if m:
@@ -43,6 +79,46 @@ def stripPathSessionID(path):
 
     return path
 
+def _aspxSessionIDsEnd(lower, i):
+    """Matches "(x(24 alnum)y(24 alnum)...)/" at lower[i:]"""
+    j = i + 1
+    while (_runEnd(lower, j, _ALPHA, 1) >= 0 and lower[j + 1:j + 2] == b'('
+           and _runEnd(lower, j + 2, _ALNUM, 24) >= 0
+           and lower[j + 26:j + 27] == b')'):
+        j += 27
+    if j == i + 1 or lower[j:j + 2] != b')/':
+        return -1
+    return j + 2
+
+def _aspxSessionIDEnd(lower, i):
+    """Matches "(24 alnum)/" at lower[i:]"""
+    j = _runEnd(lower, i + 1, _ALNUM, 24)
+    if j < 0 or lower[j:j + 2] != b')/':
+        return -1
+    return j + 2
+
+def _stripAspxSessionID(path, sessionIDEnd):
+    """Removes the session id from "/<session id>/<file>.aspx..." at the
+    last '/' where it matches, like the _RES_PATH_SESSIONID regexes do."""
+    lower = path.lower()
+    aspx = question = None
+    i = lower.rfind(b'/(')
+    while i >= 0:
+        end = sessionIDEnd(lower, i + 1)
+        if end >= 0:
+            if aspx is None:
+                aspx = _positions(lower, b'.aspx')
+                question = _positions(lower, b'?')
+            # the rest must be at least one char other than '?' and then
+            # ".aspx", i.e. the next ".aspx" comes before the next '?'
+            k = bisect_left(aspx, end + 1)
+            if k < len(aspx):
+                m = bisect_left(question, end)
+                if m == len(question) or question[m] > aspx[k]:
+                    return path[:i + 1] + path[end:]
+        i = lower.rfind(b'/(', 0, i + 1)
+    return path
+
 
 # stripQuerySessionID
 #_______________________________________________________________________________
@@ -55,6 +131,23 @@ _RES_QUERY_SESSIONID = [
     ]
 
 def stripQuerySessionID(query):
+    lower = query.lower()
+    # all of the session ids have "id" in their name
+    if b'id' not in lower:
+        return query
+    if b'\n' in query:
+        return _stripQuerySessionIDRegex(query)
+
+    for name, sessionIDEnd in _QUERY_SESSIONIDS:
+        if name in lower:
+            stripped = _stripQuerySessionID(query, lower, name, sessionIDEnd)
+            if stripped is not query:
+                query = stripped
+                lower = query.lower()
+
+    return query
+
+def _stripQuerySessionIDRegex(query):
     for pattern in _RES_QUERY_SESSIONID:
         m = pattern.match(query)
         if m:
@@ -65,6 +158,57 @@ def stripQuerySessionID(query):
 
     return query
 
+def _stripQuerySessionID(query, lower, name, sessionIDEnd):
+    """Removes the last "<name>...(&|$)" for which sessionIDEnd() finds a
+    session id, as the _RES_QUERY_SESSIONID regexes do with their greedy
+    "^(.*)"."""
+    n = len(lower)
+    ampersands = []
+    i = lower.rfind(name)
+    while i >= 0:
+        end = sessionIDEnd(lower, i, ampersands)
+        if end == n or (end >= 0 and lower[end:end + 1] == b'&'):
+            return query[:i] + query[end + 1:]
+        i = lower.rfind(name, 0, i + len(name) - 1)
+    return query
+
+def _jsessionidEnd(lower, i, ampersands):
+    return _runEnd(lower, i + 11, _ALNUM, 32)
+
+def _phpsessidEnd(lower, i, ampersands):
+    return _runEnd(lower, i + 10, _ALNUM, 32)
+
+def _sidEnd(lower, i, ampersands):
+    return _runEnd(lower, i + 4, _ALNUM, 32)
+
+def _aspsessionidEnd(lower, i, ampersands):
+    j = _runEnd(lower, i + 12, _ALPHA, 8)
+    if j < 0 or lower[j:j + 1] != b'=':
+        return -1
+    return _runEnd(lower, j + 1, _ALPHA, 24)
+
+def _cfidEnd(lower, i, ampersands):
+    """Matches "cfid=[^&]+&cftoken=[^&]+" at lower[i:]. ampersands is filled
+    in with the positions of all '&' on first use."""
+    if not ampersands:
+        ampersands.extend(_positions(lower, b'&'))
+        ampersands.append(len(lower))
+    j = ampersands[bisect_left(ampersands, i + 5)]
+    if j == i + 5 or lower[j:j + 9] != b'&cftoken=':
+        return -1
+    end = ampersands[bisect_left(ampersands, j + 9)]
+    if end == j + 9:
+        return -1
+    return end
+
+_QUERY_SESSIONIDS = [
+    (b'jsessionid=', _jsessionidEnd),
+    (b'phpsessid=', _phpsessidEnd),
+    (b'sid=', _sidEnd),
+    (b'aspsessionid', _aspsessionidEnd),
+    (b'cfid=', _cfidEnd),
+    ]
+
 
 # hostToSURT
 #_______________________________________________________________________________
@@ -28,10 +28,23 @@ http://archive-access.svn.sourceforge.net/viewvc/archive-access/trunk/archive-ac
 from __future__ import absolute_import
 
 from surt.handyurl import handyurl
-from surt.surt import surt
+from surt.surt import surt, surt_many, iter_surt, surt_into, surt_range
+from surt.surt import surt_ranges
+from surt.surt import surt_column, surt_host_key
+from surt.profile import CanonicalizerProfile
+from surt.timing import StageTimer
 
 
 __all__= [
     'handyurl',
-    'surt'
+    'surt',
+    'surt_many',
+    'iter_surt',
+    'surt_into',
+    'surt_range',
+    'surt_ranges',
+    'surt_column',
+    'surt_host_key',
+    'CanonicalizerProfile',
+    'StageTimer',
 ]
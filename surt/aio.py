@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+
+# Copyright(c)2012-2013 Internet Archive. Software license AGPL version 3.
+#
+# This file is part of the `surt` python package.
+#
+#     surt is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU Affero General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     surt is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public License
+#     along with surt.  If not, see <http://www.gnu.org/licenses/>.
+#
+#     The surt source is hosted at https://github.com/internetarchive/surt
+
+"""asyncio front end for surt(), for crawlers and indexers that must not
+block their event loop.
+
+The urls are cut into chunks and each chunk is keyed with surt_many() on
+an executor: the loop's default thread pool unless another executor is
+given. A ProcessPoolExecutor keeps the canonicalization off the event
+loop's process altogether, which pays off for large chunks. At most
+max_pending chunks are queued or running at a time, so a fast producer
+can't run ahead of the executor, and the keys come back in the order of
+the urls:
+
+>>> async for key in aiter_surt(urls, executor=pool, chunk_size=1000):
+...     index.add(key)
+>>> keys = await surt_batch(urls)
+
+This module needs python 3.6 or later and is not imported by
+"import surt".
+"""
+
+from __future__ import absolute_import
+
+import os
+import asyncio
+import collections
+
+from surt.surt import surt_many, _BYTES_TYPES
+
+DEFAULT_CHUNK_SIZE = 1000
+
+def _surt_chunk(urls, canonicalizer, options):
+    return surt_many(urls, canonicalizer=canonicalizer, **options)
+
+def _done(loop, keys):
+    future = loop.create_future()
+    future.set_result(keys)
+    return future
+
+async def _chunks(urls, chunk_size):
+    chunk = []
+    if hasattr(urls, '__aiter__'):
+        async for url in urls:
+            chunk.append(url)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    else:
+        for url in urls:
+            chunk.append(url)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+# aiter_surt()
+#_______________________________________________________________________________
+async def aiter_surt(urls, canonicalizer=None, executor=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE, max_pending=None,
+                     **options):
+    """Async generator of the SURT keys of urls, an iterable or an async
+    iterable, in order. options are passed to surt().
+
+    executor defaults to the event loop's default executor. max_pending
+    is the number of chunks that may be queued or running at once, by
+    default twice the number of cpus. If the generator is closed early,
+    the chunks that have not started yet are cancelled.
+
+    As with surt_many(), the first url that is not None decides whether
+    the keys are bytes or text, for every chunk.
+    """
+    loop = asyncio.get_event_loop()
+    if max_pending is None:
+        max_pending = 2 * (os.cpu_count() or 1)
+    pending = collections.deque()
+    dash = None     # the key of a None url, once a url tells the type
+    held = 0        # None urls seen before that
+    try:
+        async for chunk in _chunks(urls, chunk_size):
+            if dash is None:
+                url = next((url for url in chunk if url is not None), None)
+                if url is None:
+                    held += len(chunk)
+                    continue
+                dash = b'-' if isinstance(url, _BYTES_TYPES) else '-'
+                pending.append(_done(loop, [dash] * held))
+            elif all(url is None for url in chunk):
+                # surt_many() alone would make these text
+                pending.append(_done(loop, [dash] * len(chunk)))
+                continue
+            pending.append(loop.run_in_executor(
+                executor, _surt_chunk, chunk, canonicalizer, options))
+            if len(pending) >= max_pending:
+                for key in await pending.popleft():
+                    yield key
+        while pending:
+            for key in await pending.popleft():
+                yield key
+        if dash is None:
+            for _ in range(held):
+                yield '-'
+    finally:
+        for future in pending:
+            future.cancel()
+
+# surt_batch()
+#_______________________________________________________________________________
+async def surt_batch(urls, canonicalizer=None, executor=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE, max_pending=None,
+                     **options):
+    """Returns the list of the SURT keys of urls, like surt_many(), without
+    blocking the event loop. The arguments are those of aiter_surt()."""
+    keys = []
+    async for key in aiter_surt(urls, canonicalizer, executor, chunk_size,
+                                max_pending, **options):
+        keys.append(key)
+    return keys
@@ -0,0 +1,317 @@
+#!/usr/bin/env python
+
+# Copyright(c)2012-2013 Internet Archive. Software license AGPL version 3.
+#
+# This file is part of the `surt` python package.
+#
+#     surt is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU Affero General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     surt is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public License
+#     along with surt.  If not, see <http://www.gnu.org/licenses/>.
+#
+#     The surt source is hosted at https://github.com/internetarchive/surt
+
+"""Recompute the urlkey column of CDX and CDXJ files.
+
+Lines are streamed through a pool of worker processes in chunks. Only the
+key field of each line is replaced; the rest of the line is copied through
+byte for byte, and the output lines come out in input order. Note that a
+new canonicalization may change the sort order of the file, so the output
+may need to be sorted again.
+
+Usage: surt-cdx [options] [input [output]]
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import os
+import sys
+import json
+import time
+import argparse
+import collections
+
+from surt.surt import surt, surt_many
+from surt.profile import CanonicalizerProfile
+
+CDX = 'cdx'
+CDXJ = 'cdxj'
+
+# Default field positions in an 11-field " CDX N b a m s k r M S V g" file.
+DEFAULT_KEY_FIELD = 0
+DEFAULT_URL_FIELD = 2
+
+# detect_format()
+#_______________________________________________________________________________
+def detect_format(line):
+    """Guess whether a data line (not a header) is CDX or CDXJ. CDXJ lines
+    are "urlkey timestamp {json}"."""
+    parts = line.split(b' ', 2)
+    if len(parts) == 3 and parts[2].startswith(b'{'):
+        return CDXJ
+    return CDX
+
+# parse_cdx_header()
+#_______________________________________________________________________________
+def parse_cdx_header(line):
+    """Returns (key_field, url_field) from a " CDX N b a ..." header line, or
+    None if the line is not a CDX header."""
+    if not line.startswith(b' CDX '):
+        return None
+    letters = line.split()[1:]
+    key_field = letters.index(b'N') if b'N' in letters else DEFAULT_KEY_FIELD
+    url_field = letters.index(b'a') if b'a' in letters else DEFAULT_URL_FIELD
+    return key_field, url_field
+
+def _field_span(line, index):
+    """Returns (start, end) of the index'th space separated field of line,
+    or None if the line has fewer fields."""
+    start = 0
+    for _ in range(index):
+        start = line.find(b' ', start) + 1
+        if not start:
+            return None
+    end = line.find(b' ', start)
+    if end < 0:
+        end = len(line.rstrip(b'\r\n'))
+    return start, end
+
+def _cdxj_url(line):
+    brace = line.find(b'{')
+    if brace < 0:
+        return None
+    try:
+        url = json.loads(line[brace:].decode('utf-8')).get('url')
+    except ValueError:
+        return None
+    if not isinstance(url, str) or not url.strip():
+        return None
+    return url.encode('utf-8')
+
+# rekey_lines()
+#_______________________________________________________________________________
+def rekey_lines(lines, format=CDX, key_field=DEFAULT_KEY_FIELD,
+                url_field=DEFAULT_URL_FIELD, **options):
+    """Returns a list of lines with the key field recomputed from the
+    original url of each line. Header lines, blank lines, lines without a
+    url and lines whose url surt() rejects are returned unchanged. options
+    are passed to surt().
+    """
+    return _rekey_lines(lines, format, key_field, url_field, options)[0]
+
+def _rekey_lines(lines, format, key_field, url_field, options):
+    """rekey_lines(), also returning the number of lines skipped because
+    surt() rejected their url"""
+    spans = []
+    urls = []
+    for line in lines:
+        if not line.strip() or line.startswith(b' CDX') or line.startswith(b'!'):
+            spans.append(None)
+            continue
+        if format == CDXJ:
+            key_span = _field_span(line, 0)
+            url = _cdxj_url(line)
+        else:
+            key_span = _field_span(line, key_field)
+            url_span = _field_span(line, url_field)
+            url = url_span and line[url_span[0]:url_span[1]]
+        if not key_span or not url:
+            spans.append(None)
+            continue
+        spans.append(key_span)
+        urls.append(url)
+
+    try:
+        keys = surt_many(urls, **options)
+    except Exception:
+        # one bad url (e.g. a port out of range) must not cost the run;
+        # find it url by url, and leave its line alone
+        keys = [_surt_or_none(url, options) for url in urls]
+    keys = iter(keys)
+
+    out = []
+    skipped = 0
+    for line, span in zip(lines, spans):
+        key = span and next(keys)
+        if key is None:
+            skipped += span is not None
+            out.append(line)
+        else:
+            out.append(line[:span[0]] + key + line[span[1]:])
+    return out, skipped
+
+def _surt_or_none(url, options):
+    """surt(), or None for a url it can't key, whatever the error"""
+    try:
+        return surt(url, **options)
+    except Exception:
+        return None
+
+
+# worker process
+#_______________________________________________________________________________
+_worker_args = None
+
+def _init_worker(format, key_field, url_field, options):
+    global _worker_args
+    # build the canonicalizer pipeline once per worker
+    options = dict(canonicalizer=CanonicalizerProfile(**options))
+    _worker_args = (format, key_field, url_field, options)
+
+def _rekey_chunk(lines):
+    format, key_field, url_field, options = _worker_args
+    start = time.time()
+    out, skipped = _rekey_lines(lines, format, key_field, url_field, options)
+    return (os.getpid(), len(lines), skipped, time.time() - start,
+            b''.join(out))
+
+def _read_head(instream, format=None):
+    """Reads instream up to and including its first data line. Returns
+    (the lines read, format, key_field, url_field), with the fields taken
+    from a " CDX ..." header if there is one, and format detected from the
+    first data line if it is None."""
+    key_field, url_field = DEFAULT_KEY_FIELD, DEFAULT_URL_FIELD
+    head = []
+    for line in instream:
+        head.append(line)
+        header = parse_cdx_header(line)
+        if header:
+            key_field, url_field = header
+        elif line.strip() and not line.startswith(b'!'):
+            if format is None:
+                format = detect_format(line)
+            break
+    return head, format or CDX, key_field, url_field
+
+def _read_chunks(stream, chunk_size, first_lines=()):
+    chunk = list(first_lines)
+    for line in stream:
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# rekey_stream()
+#_______________________________________________________________________________
+def rekey_stream(instream, outstream, workers=None, chunk_size=10000,
+                 format=None, **options):
+    """Reads CDX or CDXJ lines from the binary instream and writes them with
+    recomputed keys to the binary outstream.
+
+    format is CDX, CDXJ or None to detect it from the first data line. A
+    " CDX ..." header, if present, tells which fields hold the key and the
+    url. With workers=1 everything runs in this process; otherwise up to
+    2 * workers chunks are in flight in a process pool at any time.
+
+    Returns a dict {pid: (lines, seconds, skipped)} with the busy time of
+    each worker and the number of lines it left unchanged because surt()
+    rejected their url.
+    """
+    head, format, key_field, url_field = _read_head(instream, format)
+    chunks = _read_chunks(instream, chunk_size, head)
+    args = (format, key_field, url_field, options)
+    stats = collections.defaultdict(lambda: [0, 0.0, 0])
+
+    def record(result):
+        pid, n, skipped, elapsed, data = result
+        stats[pid][0] += n
+        stats[pid][1] += elapsed
+        stats[pid][2] += skipped
+        outstream.write(data)
+
+    if workers == 1:
+        _init_worker(*args)
+        for chunk in chunks:
+            record(_rekey_chunk(chunk))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=args) as executor:
+            # bounded queue of futures, so we never read much further
+            # ahead of the output than the workers can keep up with
+            pending = collections.deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_rekey_chunk, chunk))
+                if len(pending) >= 2 * workers:
+                    record(pending.popleft().result())
+            while pending:
+                record(pending.popleft().result())
+
+    return dict((pid, tuple(v)) for pid, v in stats.items())
+
+# main()
+#_______________________________________________________________________________
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+            prog='surt-cdx',
+            description='Recompute the urlkey column of CDX or CDXJ files.')
+    parser.add_argument('input', nargs='?', default='-',
+                        help='input file (default: stdin)')
+    parser.add_argument('output', nargs='?', default='-',
+                        help='output file (default: stdout)')
+    parser.add_argument('-f', '--format', choices=[CDX, CDXJ],
+                        help='input format (default: detect)')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='number of worker processes (default: number '
+                             'of cpus)')
+    parser.add_argument('-c', '--chunk-size', type=int, default=10000,
+                        help='lines per chunk sent to a worker')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help="don't report throughput on stderr")
+    parser.add_argument('--with-scheme', action='store_true')
+    parser.add_argument('--trailing-comma', action='store_true')
+    parser.add_argument('--public-suffix', action='store_true')
+    parser.add_argument('--no-host-massage', dest='host_massage',
+                        action='store_false')
+    parser.add_argument('--no-reverse-ipaddr', dest='reverse_ipaddr',
+                        action='store_false')
+    args = parser.parse_args(argv)
+
+    options = dict(with_scheme=args.with_scheme,
+                   trailing_comma=args.trailing_comma,
+                   public_suffix=args.public_suffix,
+                   host_massage=args.host_massage,
+                   reverse_ipaddr=args.reverse_ipaddr)
+
+    stdin = getattr(sys.stdin, 'buffer', sys.stdin)
+    stdout = getattr(sys.stdout, 'buffer', sys.stdout)
+    instream = stdin if args.input == '-' else open(args.input, 'rb')
+    outstream = stdout if args.output == '-' else open(args.output, 'wb')
+
+    start = time.time()
+    try:
+        stats = rekey_stream(instream, outstream, workers=args.workers,
+                             chunk_size=args.chunk_size, format=args.format,
+                             **options)
+    finally:
+        if instream is not stdin:
+            instream.close()
+        if outstream is not stdout:
+            outstream.close()
+        else:
+            outstream.flush()
+    elapsed = time.time() - start
+
+    if not args.quiet:
+        total = sum(n for n, _, _ in stats.values())
+        skipped = sum(s for _, _, s in stats.values())
+        print('surt-cdx: %d lines in %.2fs, %.0f lines/s, %d skipped' % (
+            total, elapsed, total / elapsed if elapsed else 0, skipped),
+            file=sys.stderr)
+        for pid, (n, busy, _) in sorted(stats.items()):
+            print('  worker %d: %d lines, %.0f lines/s' % (
+                pid, n, n / busy if busy else 0), file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
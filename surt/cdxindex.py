@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+
+# Copyright(c)2012-2013 Internet Archive. Software license AGPL version 3.
+#
+# This file is part of the `surt` python package.
+#
+#     surt is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU Affero General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     surt is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public License
+#     along with surt.  If not, see <http://www.gnu.org/licenses/>.
+#
+#     The surt source is hosted at https://github.com/internetarchive/surt
+
+"""Binary search lookups in sorted CDX and CDXJ files.
+
+A CDXIndex memory-maps a file whose lines are sorted by their urlkey, the
+first space separated field (as written by "LC_ALL=C sort"), and finds
+the lines for a key, a key prefix or the surt_ranges() of a url by
+bisecting on the byte offsets of the file. Each probe reads one line, so a lookup touches
+only the pages of the O(log n) lines it probes and of the lines it
+returns, and nothing is read into memory up front:
+
+>>> with CDXIndex('index.cdx') as index:
+...     for line in index.lookup('http://archive.org/details/', 'prefix'):
+...         print(line)
+
+Header lines (" CDX ..." and CDXJ "!meta" lines) sort before the data
+lines and are never returned for a non-empty key.
+"""
+
+from __future__ import absolute_import
+
+import mmap
+import itertools
+
+from surt.surt import surt_ranges, _prefixEnd
+
+# CDXIndex
+#_______________________________________________________________________________
+class CDXIndex(object):
+    """A sorted CDX or CDXJ file, memory-mapped for lookups.
+
+    Keys are bytes; text keys are encoded as utf-8. Lines are returned as
+    bytes, with their line ending. Close the index, or use it as a context
+    manager, to unmap the file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # an empty file can't be mapped
+            self._mm = b''
+        else:
+            if hasattr(self._mm, 'madvise') and hasattr(mmap, 'MADV_RANDOM'):
+                # the probes jump around, so don't read ahead of them
+                self._mm.madvise(mmap.MADV_RANDOM)
+        self.size = len(self._mm)
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def bisect(self, key):
+        """Returns the offset of the first line whose urlkey is not less
+        than key, or the size of the file if there is none."""
+        key = _toBytes(key)
+        mm = self._mm
+        # lo is always the start of a line; every line that starts before
+        # lo has a smaller key and every line that starts at hi or later
+        # has a key that is not smaller
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = mm.rfind(b'\n', lo, mid) + 1 or lo
+            end = mm.find(b'\n', start)
+            if end < 0:
+                end = self.size
+            if self._key(start, end) < key:
+                lo = end + 1
+            else:
+                hi = start
+        return min(lo, self.size)
+
+    def iter_range(self, start, end):
+        """Yields the lines with start <= urlkey < end, in file order. An
+        end of None means to the end of the file."""
+        start = _toBytes(start)
+        if end is None:
+            for line in self.iter_lines(self.bisect(start)):
+                yield line
+            return
+        end = _toBytes(end)
+        mm = self._mm
+        size = self.size
+        pos = self.bisect(start)
+        while pos < size:
+            nl = mm.find(b'\n', pos)
+            nl = size if nl < 0 else nl + 1
+            if self._key(pos, nl) >= end:
+                return
+            yield mm[pos:nl]
+            pos = nl
+
+    def iter_lines(self, offset=0):
+        """Yields the lines from offset, which must be the start of a line,
+        to the end of the file."""
+        mm = self._mm
+        size = self.size
+        while offset < size:
+            nl = mm.find(b'\n', offset)
+            nl = size if nl < 0 else nl + 1
+            yield mm[offset:nl]
+            offset = nl
+
+    def previous_line(self, offset):
+        """Returns the start of the line before the one that starts at
+        offset, or 0 if there is none."""
+        if offset <= 0:
+            return 0
+        return self._mm.rfind(b'\n', 0, offset - 1) + 1
+
+    def iter_exact(self, key):
+        """Yields the lines whose urlkey is key."""
+        key = _toBytes(key)
+        return self.iter_range(key, key + b'\0')
+
+    def iter_prefix(self, prefix):
+        """Yields the lines whose urlkey starts with prefix."""
+        prefix = _toBytes(prefix)
+        if not prefix.rstrip(b'\xff'):
+            # every key starts with b'', and nothing sorts after b'\xff...'
+            return self.iter_range(prefix, None)
+        return self.iter_range(prefix, _prefixEnd(prefix))
+
+    def lookup(self, url, match_type=None, **options):
+        """Yields the lines that match url; see surt_ranges() for the match
+        types and the patterns. The options must be the ones the keys of
+        the file were made with."""
+        ranges = surt_ranges(_toBytes(url), match_type, **options)
+        return itertools.chain.from_iterable(
+                self.iter_range(start, end) for start, end in ranges)
+
+    def _key(self, start, end):
+        """The urlkey of the line at start, which ends at end"""
+        mm = self._mm
+        space = mm.find(b' ', start, end)
+        if space < 0:
+            # a line that is only a key, or a ZipNum summary line with a
+            # key and no timestamp before the tab
+            tab = mm.find(b'\t', start, end)
+            if tab >= 0:
+                return mm[start:tab]
+            return mm[start:end].rstrip(b'\r\n')
+        return mm[start:space]
+
+def _toBytes(key):
+    if isinstance(key, bytes):
+        return key
+    if isinstance(key, (bytearray, memoryview)):
+        return bytes(key)
+    return key.encode('utf-8')
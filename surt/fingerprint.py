@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+
+# Copyright(c)2012-2013 Internet Archive. Software license AGPL version 3.
+#
+# This file is part of the `surt` python package.
+#
+#     surt is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU Affero General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     surt is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public License
+#     along with surt.  If not, see <http://www.gnu.org/licenses/>.
+#
+#     The surt source is hosted at https://github.com/internetarchive/surt
+
+"""64-bit fingerprints of SURT keys and a Bloom filter seen-set for them.
+
+The fingerprint of a key follows the layout of Heritrix's host-aware url
+fingerprints (BdbUriUniqFilter.createKey()): the high 24 bits are a hash
+of the host part of the key and the low 40 bits a hash of the whole key,
+so fingerprints of urls on the same host sort next to each other. Here
+the host part is the SURT host, everything up to and including the ")"
+(e.g. "org,archive)"), and the hash is the stdlib blake2b rather than
+Heritrix's Rabin polynomials, so the values are stable across platforms
+and releases but not equal to Heritrix's.
+
+>>> fp = surt_fingerprint('http://www.archive.org/details/foo')
+>>> fp >> 40 == surt_fingerprint('http://archive.org/') >> 40
+True
+
+SeenSet is a Bloom filter of fingerprints with a fixed size, chosen from
+the number of entries it should hold and the false positive rate wanted
+at that size, e.g. 1.8 GB for a billion urls at 1 in 1000. It never
+forgets a fingerprint that was added, and can be saved to disk and loaded
+back for restarts.
+"""
+
+from __future__ import absolute_import, division
+
+import os
+import math
+import struct
+import hashlib
+from array import array
+
+from surt.surt import iter_surt, surt
+
+HOST_BITS = 24
+KEY_BITS = 40
+
+# fingerprints
+#_______________________________________________________________________________
+def key_fingerprint(key):
+    """The 64-bit fingerprint of a SURT key (bytes or text)."""
+    if not isinstance(key, bytes):
+        key = key.encode('utf-8')
+    host_end = key.find(b')') + 1 or len(key)
+    host = hashlib.blake2b(key[:host_end], digest_size=3).digest()
+    whole = hashlib.blake2b(key, digest_size=5).digest()
+    return int.from_bytes(host + whole, 'big')
+
+def surt_fingerprint(url, canonicalizer=None, **options):
+    """The fingerprint of surt(url, canonicalizer, **options)."""
+    return key_fingerprint(surt(url, canonicalizer, **options))
+
+def fingerprint_many(urls, canonicalizer=None, **options):
+    """The fingerprints of a batch of urls, as an array of unsigned 64-bit
+    ints, computed with iter_surt()."""
+    return array('Q', [key_fingerprint(key)
+                       for key in iter_surt(urls, canonicalizer, **options)])
+
+def key_fingerprint_many(keys):
+    """The fingerprints of a batch of SURT keys, as an array('Q')."""
+    return array('Q', [key_fingerprint(key) for key in keys])
+
+# SeenSet
+#_______________________________________________________________________________
+_MAGIC = b'SURTSEEN'
+_HEADER = struct.Struct('>8sQQQ')
+_MASK64 = (1 << 64) - 1
+
+def _mix(x):
+    """splitmix64 finalizer: spreads the bits of a fingerprint, so that
+    fingerprints that share their host bits hash to unrelated bits"""
+    x = ((x ^ (x >> 30)) * 0xbf58476d1ce4e5b9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94d049bb133111eb) & _MASK64
+    return x ^ (x >> 31)
+
+class SeenSet(object):
+    """A Bloom filter of 64-bit fingerprints.
+
+    capacity is the number of fingerprints it is sized for and error_rate
+    the false positive rate at that many; past capacity it keeps working,
+    with a rising error rate. Membership is approximate one way only: a
+    fingerprint that was added is always found.
+    """
+    def __init__(self, capacity, error_rate=0.001):
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1')
+        if not 0 < error_rate < 1:
+            raise ValueError('error_rate must be between 0 and 1')
+        bits = int(math.ceil(-capacity * math.log(error_rate)
+                             / math.log(2) ** 2))
+        hashes = max(1, int(round(bits / capacity * math.log(2))))
+        self._init(bits, hashes, 0, bytearray((bits + 7) // 8))
+
+    def _init(self, bits, hashes, count, data):
+        self.bits = bits
+        self.hashes = hashes
+        self.count = count
+        self._data = data
+
+    def __len__(self):
+        """The number of fingerprints added that were not found already."""
+        return self.count
+
+    @property
+    def nbytes(self):
+        return len(self._data)
+
+    def _positions(self, fp):
+        # double hashing: position i is h1 + i * h2
+        h1 = _mix(fp)
+        h2 = _mix(h1 ^ fp) | 1
+        bits = self.bits
+        return [(h1 + i * h2) % bits for i in range(self.hashes)]
+
+    def add(self, fp):
+        """Adds fp, and returns True if it was not in the set before."""
+        data = self._data
+        new = False
+        for pos in self._positions(fp):
+            byte, bit = pos >> 3, 1 << (pos & 7)
+            if not data[byte] & bit:
+                data[byte] |= bit
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def __contains__(self, fp):
+        data = self._data
+        for pos in self._positions(fp):
+            if not data[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def add_many(self, fps):
+        """Adds the fingerprints in order, and returns a list with True for
+        each one that was not in the set before (or earlier in fps)."""
+        add = self.add
+        return [add(fp) for fp in fps]
+
+    def contains_many(self, fps):
+        """Returns a list with True for each fingerprint in the set."""
+        contains = self.__contains__
+        return [contains(fp) for fp in fps]
+
+    def save(self, path):
+        """Writes the set to path, through a temporary file so that a crash
+        never leaves a half written file behind."""
+        tmp = '%s.tmp%d' % (path, os.getpid())
+        with open(tmp, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, self.bits, self.hashes, self.count))
+            f.write(self._data)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """Reads a set written by save()."""
+        with open(path, 'rb') as f:
+            header = f.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                raise ValueError('%s is not a SeenSet file' % path)
+            magic, bits, hashes, count = _HEADER.unpack(header)
+            if magic != _MAGIC:
+                raise ValueError('%s is not a SeenSet file' % path)
+            data = bytearray(f.read())
+        if len(data) != (bits + 7) // 8:
+            raise ValueError('%s is truncated' % path)
+        seen = cls.__new__(cls)
+        seen._init(bits, hashes, count, data)
+        return seen
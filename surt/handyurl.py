@@ -23,19 +23,30 @@
 from __future__ import absolute_import
 
 import re
-import tldextract
-import collections
-
-try:
-    from urllib.parse import SplitResultBytes
-except:
-    from urlparse import SplitResult as SplitResultBytes
 
 from surt.URLRegexTransformer import hostToSURT
+from surt.publicsuffix import registered_domain, subdomain
 
 _RE_MULTIPLE_PROTOCOLS = re.compile(br'^(https?://)+')
 _RE_HAS_PROTOCOL = re.compile(b"^([a-zA-Z][a-zA-Z0-9\+\-\.]*):")
 _RE_SPACES = re.compile(b'[\n\r\t]')
+_SCHEME_CHARS = (b'abcdefghijklmnopqrstuvwxyz'
+                 b'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789+-.')
+
+def _tobytes(url):
+    """Text urls are encoded as utf-8; bytearray and memoryview urls are
+    copied into bytes."""
+    if isinstance(url, (bytearray, memoryview)):
+        return bytes(url)
+    return url.encode('utf-8')
+
+def _surtHost(host, public_suffix, surt, reverse_ipaddr):
+    """The host as geturl_bytes() writes it out"""
+    if public_suffix:
+        host = registered_domain(host)
+    if surt:
+        host = hostToSURT(host, reverse_ipaddr)
+    return host
 
 class handyurl(object):
     """A python port of the archive-commons org.archive.url HandyURL class
@@ -59,7 +70,14 @@ class handyurl(object):
     We want the url http://www.google.com/? to work, since there is a test for
     it in the GoogleURLCanonicalizer class. Note, however, the IAURLCanonicalizer
     class strips empty queries.
+
+    handyurl uses __slots__, so instances have no __dict__ and take much less
+    memory when millions of them are kept around. See also the intern_table
+    argument of parse().
     """
+    __slots__ = ('scheme', 'authUser', 'authPass', 'host', 'port', 'path',
+                 'query', 'hash', 'last_delimiter')
+
     DEFAULT_PORT = None
 
     # init
@@ -77,6 +95,21 @@ class handyurl(object):
         self.hash     = hash
         self.last_delimiter = last_delimiter #added in python version
 
+    # pickling
+    #___________________________________________________________________________
+    # Without these, protocols 0 and 1 can't pickle a class with __slots__.
+    # The state is the dict that handyurl had before it had slots, so that
+    # old pickles still load.
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        if isinstance(state, tuple):
+            # (None, slots) of protocol 2 and up without __getstate__
+            state = state[1]
+        for name in self.__slots__:
+            setattr(self, name, state.get(name))
+
 
     '''
     RFC 2396-inspired regex.
@@ -156,6 +189,10 @@ class handyurl(object):
         """Similar to urllib.parse.urlsplit, but does not try to decode raw
         bytes. (Library method fails on non-ascii)"""
         assert isinstance(url, bytes)
+        try:
+            from urllib.parse import SplitResultBytes
+        except ImportError:
+            from urlparse import SplitResult as SplitResultBytes
 
         m = cls.RFC2396REGEX.match(url)
         assert m
@@ -167,41 +204,120 @@ class handyurl(object):
     # parse() classmethod
     #___________________________________________________________________________
     @classmethod
-    def parse(cls, url):
+    def parse(cls, url, intern_table=None, use_regex=False):
         u"""This method was in the java URLParser class, but we don't need
         a whole class to parse a url, when we can just use python's urlparse.
 
+        url may be text, bytes, bytearray or memoryview.
+
+        The url is split in a single left-to-right pass of bytes.find()
+        calls. With use_regex=True it goes through the RFC2396REGEX and
+        urlparse based parser instead, which is kept as the reference
+        implementation; both give the same results.
+
+        If intern_table is a dict, the scheme and host of the new handyurl
+        are interned in it: urls with the same host share a single bytes
+        object for it. The caller owns the table and decides how long it
+        lives, e.g. one table per batch of urls.
         """
+        if use_regex:
+            return cls._parse_regex(url, intern_table)
 
         if not isinstance(url, bytes):
-            url = url.encode('utf-8')
+            url = _tobytes(url)
 
-        # Note RE_SPACES does not match regular space (0x20). That is,
-        # regular spaces are removed at head and tail, but not in the middle.
-        # There's a test case for GoogleURLCanonicalizer.canonicalize that
-        # asserts this behavior.
-        url = url.strip()
-        url = _RE_SPACES.sub(b'', url)
+        # See the note on RE_SPACES in _parse_regex()
+        url = url.strip().translate(None, b'\n\r\t')
+        if not url:
+            return cls._build(url, None, b'', b'', b'', b'', intern_table)
 
-        url = cls.addDefaultSchemeIfNeeded(url)
+        colon = url.find(b':')
+        if not (colon > 0 and url[:1].isalpha()
+                and not url[1:colon].translate(None, _SCHEME_CHARS)):
+            url = b'http://' + url
+            colon = 4
 
         #From Tymm: deal with http://https/order.1and1.com
-        url = _RE_MULTIPLE_PROTOCOLS.sub(lambda m: m.group(1), url)
+        if url.startswith(b'http://') or url.startswith(b'https://'):
+            start = 0
+            while True:
+                pos = url.find(b'://', start) + 3
+                if not (url.startswith(b'http://', pos)
+                        or url.startswith(b'https://', pos)):
+                    break
+                start = pos
+            if start:
+                url = url[start:]
+                colon = url.find(b':')
+
+        scheme = url[:colon]
+        end = len(url)
+
+        pos = url.find(b'#', colon + 1)
+        if pos >= 0:
+            fragment = url[pos + 1:]
+            end = pos
+        else:
+            fragment = b''
 
-        o = cls.urlsplit(url)
+        pos = url.find(b'?', colon + 1, end)
+        if pos >= 0:
+            query = url[pos + 1:end]
+            end = pos
+        else:
+            query = b''
+
+        if url.startswith(b'//', colon + 1):
+            pos = url.find(b'/', colon + 3, end)
+            if pos < 0:
+                pos = end
+            netloc = url[colon + 3:pos]
+            path = url[pos:end]
+        else:
+            netloc = b''
+            path = url[colon + 1:end]
 
-        scheme   = o.scheme   or None
-        query    = o.query    or None
-        fragment = o.fragment or None
+        return cls._build(url, scheme, netloc, path, query, fragment,
+                          intern_table)
 
-        """Deal with hostnames that end with ':' without being followed by a port number"""
-        if o.netloc.endswith(b':'):
-            o = o._replace(netloc=o.netloc.rstrip(b':'))
-        port     = o.port     or None
+    @classmethod
+    def _build(cls, url, scheme, netloc, path, query, fragment, intern_table):
+        """Makes the handyurl from the split components, the same way
+        _parse_regex() does from a SplitResultBytes."""
+        # Deal with hostnames that end with ':' without being followed by a
+        # port number
+        if netloc.endswith(b':'):
+            netloc = netloc.rstrip(b':')
+
+        # host and port, as SplitResultBytes.hostname and .port compute them
+        hostinfo = netloc.rpartition(b'@')[2]
+        _, have_open_br, bracketed = hostinfo.partition(b'[')
+        if have_open_br:
+            hostname, _, port = bracketed.partition(b']')
+            port = port.partition(b':')[2]
+        else:
+            hostname, _, port = hostinfo.partition(b':')
 
-        hostname = o.hostname or None
-        path     = o.path     or None
+        if port:
+            if not port.isdigit():
+                raise ValueError(
+                        'Port could not be cast to integer value as %r' % port)
+            port = int(port)
+            if not (0 <= port <= 65535):
+                raise ValueError("Port out of range 0-65535")
+        port = port or None
 
+        if hostname:
+            hostname, percent, zone = hostname.partition(b'%')
+            hostname = hostname.lower() + percent + zone
+        hostname = hostname or None
+
+        return cls._finish(url, scheme or None, hostname, port, path or None,
+                           query or None, fragment or None, intern_table)
+
+    @classmethod
+    def _finish(cls, url, scheme, hostname, port, path, query, fragment,
+                intern_table):
         if scheme.startswith(b'http'):
             #deal with "http:////////////////www.vikings.com"
             if hostname is None and path is not None:
@@ -209,6 +325,11 @@ class handyurl(object):
                 hostname = parts[0]
                 path     = b'/'+parts[2]
 
+        if intern_table is not None:
+            scheme = intern_table.setdefault(scheme, scheme)
+            if hostname is not None:
+                hostname = intern_table.setdefault(hostname, hostname)
+
         h = cls(scheme = scheme,
                 host   = hostname,
                 path   = path,
@@ -223,6 +344,41 @@ class handyurl(object):
 
         return h
 
+    @classmethod
+    def _parse_regex(cls, url, intern_table=None):
+        """The reference implementation of parse()"""
+        if not isinstance(url, bytes):
+            url = _tobytes(url)
+
+        # Note RE_SPACES does not match regular space (0x20). That is,
+        # regular spaces are removed at head and tail, but not in the middle.
+        # There's a test case for GoogleURLCanonicalizer.canonicalize that
+        # asserts this behavior.
+        url = url.strip()
+        url = _RE_SPACES.sub(b'', url)
+
+        url = cls.addDefaultSchemeIfNeeded(url)
+
+        #From Tymm: deal with http://https/order.1and1.com
+        url = _RE_MULTIPLE_PROTOCOLS.sub(lambda m: m.group(1), url)
+
+        o = cls.urlsplit(url)
+
+        scheme   = o.scheme   or None
+        query    = o.query    or None
+        fragment = o.fragment or None
+
+        """Deal with hostnames that end with ':' without being followed by a port number"""
+        if o.netloc.endswith(b':'):
+            o = o._replace(netloc=o.netloc.rstrip(b':'))
+        port     = o.port     or None
+
+        hostname = o.hostname or None
+        path     = o.path     or None
+
+        return cls._finish(url, scheme, hostname, port, path, query, fragment,
+                           intern_table)
+
     # addDefaultSchemeIfNeeded()
     #___________________________________________________________________________
     """copied from URLParser.java"""
@@ -256,74 +412,127 @@ class handyurl(object):
                      trailing_comma=False,
                      reverse_ipaddr=True,
                      with_scheme=True,
+                     host_cache=None,
                      **options):
+        parts = []
+        self._writeurl(parts.append, surt, public_suffix, trailing_comma,
+                       reverse_ipaddr, with_scheme, host_cache)
+        return b''.join(parts)
+
+    # geturl_into()
+    #___________________________________________________________________________
+    def geturl_into(self, out,
+                    surt=False,
+                    public_suffix=False,
+                    trailing_comma=False,
+                    reverse_ipaddr=True,
+                    with_scheme=True,
+                    host_cache=None,
+                    **options):
+        """Like geturl_bytes(), but appends the url to the bytearray out
+        instead of returning a new bytes object."""
+        self._writeurl(out.extend, surt, public_suffix, trailing_comma,
+                       reverse_ipaddr, with_scheme, host_cache)
+
+    # gethost_bytes()
+    #___________________________________________________________________________
+    def gethost_bytes(self,
+                      surt=False,
+                      public_suffix=False,
+                      trailing_comma=False,
+                      reverse_ipaddr=True,
+                      with_scheme=True,
+                      host_cache=None,
+                      **options):
+        """Like geturl_bytes(), but stops at the end of the host: the
+        scheme, the user info, the host and the port, and in a SURT the
+        closing ")"."""
+        parts = []
+        self._writehost(parts.append, surt, public_suffix, trailing_comma,
+                        reverse_ipaddr, with_scheme, host_cache)
+        return b''.join(parts)
+
+    def _writeurl(self, write, surt, public_suffix, trailing_comma,
+                  reverse_ipaddr, with_scheme, host_cache):
+        self._writehost(write, surt, public_suffix, trailing_comma,
+                        reverse_ipaddr, with_scheme, host_cache)
+
+        if self.path:
+            write(self.path)
+        elif self.query is not None or self.hash is not None:
+            #must have '/' with query or hash:
+            write(b'/')
+
+        if None != self.query:
+            write(b'?')
+            write(self.query)
+        if None != self.hash:
+            write(b'#')
+            write(self.hash)
+
+        if None != self.last_delimiter:
+            write(self.last_delimiter)
+
+    def _writehost(self, write, surt, public_suffix, trailing_comma,
+                   reverse_ipaddr, with_scheme, host_cache):
+        """Writes the url up to the end of the host: the scheme, the user
+        info, the host and the port, and in a SURT the closing ")"."""
         hostSrc = self.host
-        if hostSrc:
-            if public_suffix:
-                hostSrc = self.getPublicSuffix()
-            if surt:
-                hostSrc = hostToSURT(hostSrc, reverse_ipaddr)
+        if hostSrc and (public_suffix or surt):
+            if host_cache is not None:
+                hostSrc = host_cache.call(
+                        _surtHost, hostSrc, public_suffix, surt, reverse_ipaddr)
+            else:
+                hostSrc = _surtHost(hostSrc, public_suffix, surt, reverse_ipaddr)
 
         if with_scheme:
-            s = self.scheme + b':'
+            write(self.scheme)
+            write(b':')
             if hostSrc:
                 if self.scheme != b'dns':
-                    s += b'//'
+                    write(b'//')
                 if surt:
-                    s += b"("
+                    write(b"(")
         elif not hostSrc:
-            s = self.scheme + b':'
-        else:
-            s = b''
+            write(self.scheme)
+            write(b':')
 
         if hostSrc:
             if self.authUser:
-                s += self.authUser
+                write(self.authUser)
                 if self.authPass:
-                    s += self.authPass
-                s += b'@'
+                    write(self.authPass)
+                write(b'@')
 
-            s += hostSrc
+            write(hostSrc)
 
             if self.port != self.DEFAULT_PORT:
-                s += (":%d" % self.port).encode('utf-8')
+                write((":%d" % self.port).encode('utf-8'))
 
             if surt:
                 if trailing_comma:
-                    s += b','
-                s += b')'
-
-        if self.path:
-            s += self.path
-        elif self.query is not None or self.hash is not None:
-            #must have '/' with query or hash:
-            s += b'/'
-
-        if None != self.query:
-            s += b'?' + self.query
-        if None != self.hash:
-            s += b'#' + self.hash
-
-        if None != self.last_delimiter:
-            s += self.last_delimiter
-
-        return s
+                    write(b',')
+                write(b')')
 
     # getPublicSuffix
     #___________________________________________________________________________
     def getPublicSuffix(self):
-        """Uses the tldextract module to get the public suffix via the
-        Public Suffix List.
+        """Returns the registered domain of the host (the domain plus its
+        public suffix, e.g. b'amazon.co.uk') as bytes, using the bundled
+        Public Suffix List; see surt.publicsuffix.
         """
-        return tldextract.extract(self.host).registered_domain.encode('ascii')
+        domain = registered_domain(self.host)
+        if not isinstance(domain, bytes):
+            domain = domain.encode('utf-8')
+        return domain
 
     # getPublicPrefix
     #___________________________________________________________________________
     def getPublicPrefix(self):
-        """Uses the tldextract module to get the subdomain, using the
-        Public Suffix List.
+        """Returns the subdomain, the part of the host in front of the
+        registered domain, using the bundled Public Suffix List.
         """
-        return tldextract.extract(self.host).subdomain
+        return subdomain(self.host)
 
     # repr
     #___________________________________________________________________________
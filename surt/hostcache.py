@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+# Copyright(c)2012-2013 Internet Archive. Software license AGPL version 3.
+#
+# This file is part of the `surt` python package.
+#
+#     surt is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU Affero General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     surt is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public License
+#     along with surt.  If not, see <http://www.gnu.org/licenses/>.
+#
+#     The surt source is hosted at https://github.com/internetarchive/surt
+
+"""Bounded LRU cache for the host canonicalization steps.
+
+In crawl data a few thousand hosts cover most of the urls, so the host
+steps of GoogleURLCanonicalizer, IAURLCanonicalizer and
+handyurl.geturl_bytes() look up their result in a HostCache when one is
+passed in the host_cache option. surt() passes default_host_cache unless
+told otherwise:
+
+>>> key = surt('http://www.archive.org/', host_cache=None)  # no caching
+>>> key = surt('http://www.archive.org/', host_cache=HostCache(100000))
+"""
+
+from __future__ import absolute_import
+
+import collections
+
+CacheInfo = collections.namedtuple(
+        'CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+DEFAULT_MAXSIZE = 16384
+
+class HostCache(object):
+    """Memoizes host step functions on their arguments, keeping at most
+    maxsize results and evicting the least recently used one first.
+
+    The key of an entry is the function plus all of its arguments, i.e. the
+    raw host bytes and whichever options the step depends on.
+    """
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = collections.OrderedDict()
+
+    def call(self, func, *args):
+        """Returns func(*args), from the cache if possible."""
+        key = (func,) + args
+        data = self._data
+        try:
+            value = data.pop(key)
+        except KeyError:
+            self.misses += 1
+            value = func(*args)
+            if len(data) >= self.maxsize:
+                try:
+                    data.popitem(last=False)
+                except KeyError:
+                    pass
+        else:
+            self.hits += 1
+        data[key] = value
+        return value
+
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def clear(self):
+        """Drops all entries and resets the hit/miss statistics."""
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+default_host_cache = HostCache()
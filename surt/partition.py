@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+
+# Copyright(c)2012-2013 Internet Archive. Software license AGPL version 3.
+#
+# This file is part of the `surt` python package.
+#
+#     surt is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU Affero General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     surt is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public License
+#     along with surt.  If not, see <http://www.gnu.org/licenses/>.
+#
+#     The surt source is hosted at https://github.com/internetarchive/surt
+
+"""Routing urls to shards by their SURT host key.
+
+Both partitioners key urls with surt_host_key(), which runs only the host
+steps of the canonicalizers, so all urls of a host go to the same shard:
+
+  HashPartitioner   consistent hashing: each shard owns many points on a
+                    ring of 64-bit hashes, and adding or removing a shard
+                    only moves the hosts next to its points
+  RangePartitioner  contiguous ranges of host keys, as in a SURT-sorted
+                    index split into shards; from_sample() picks the
+                    boundaries that split a sample of keys evenly
+
+>>> shards = HashPartitioner(['index-a', 'index-b', 'index-c'])
+>>> shards.shard('http://www.archive.org/details/x')
+'index-b'
+"""
+
+from __future__ import absolute_import
+
+import bisect
+import hashlib
+
+from surt.surt import surt_host_key
+
+def _hash64(data):
+    if not isinstance(data, bytes):
+        data = data.encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+class _Partitioner(object):
+    def shard(self, url):
+        """The shard of url."""
+        return self.shard_for_key(surt_host_key(url, **self.options))
+
+    def shard_many(self, urls):
+        """The shards of urls, as a list."""
+        options = self.options
+        shard_for_key = self.shard_for_key
+        return [shard_for_key(surt_host_key(url, **options)) for url in urls]
+
+    def host_key(self, url):
+        """The key that url is routed by."""
+        return surt_host_key(url, **self.options)
+
+# HashPartitioner
+#_______________________________________________________________________________
+class HashPartitioner(_Partitioner):
+    """Consistent hashing of host keys onto shards.
+
+    shards is a list of shard names (anything with a stable str()), or a
+    number n for the shards 0 to n-1. Each shard gets replicas points on
+    the ring; more points spread the hosts more evenly. The hash is
+    blake2b, so the mapping is the same in every process and release.
+    options are passed to surt_host_key().
+    """
+    def __init__(self, shards, replicas=100, **options):
+        if isinstance(shards, int):
+            shards = list(range(shards))
+        if not shards:
+            raise ValueError('no shards')
+        self.shards = list(shards)
+        self.replicas = replicas
+        self.options = options
+        ring = sorted((_hash64('%s#%d' % (shard, i)), n)
+                      for n, shard in enumerate(self.shards)
+                      for i in range(replicas))
+        self._points = [point for point, _ in ring]
+        self._owners = [self.shards[n] for _, n in ring]
+
+    def shard_for_key(self, host_key):
+        """The shard of a host key: the owner of the first point on the ring
+        at or after its hash."""
+        i = bisect.bisect_left(self._points, _hash64(host_key))
+        if i == len(self._points):
+            i = 0
+        return self._owners[i]
+
+# RangePartitioner
+#_______________________________________________________________________________
+class RangePartitioner(_Partitioner):
+    """Contiguous ranges of host keys.
+
+    boundaries are the sorted host keys (bytes) at which each shard after
+    the first starts, so there is one more shard than boundaries: shard i
+    holds the keys k with boundaries[i-1] <= k < boundaries[i]. shards
+    names the shards, and defaults to their numbers. options are passed to
+    surt_host_key().
+    """
+    def __init__(self, boundaries, shards=None, **options):
+        boundaries = [_toBytes(b) for b in boundaries]
+        if boundaries != sorted(boundaries):
+            raise ValueError('boundaries must be sorted')
+        if shards is None:
+            shards = list(range(len(boundaries) + 1))
+        if len(shards) != len(boundaries) + 1:
+            raise ValueError('need %d shards for %d boundaries, not %d' % (
+                len(boundaries) + 1, len(boundaries), len(shards)))
+        self.boundaries = boundaries
+        self.shards = list(shards)
+        self.options = options
+
+    @classmethod
+    def from_sample(cls, urls, n, shards=None, **options):
+        """Splits the host keys of a sample of urls into n ranges that hold
+        about as many of the sample's urls each."""
+        keys = sorted(_toBytes(surt_host_key(url, **options)) for url in urls)
+        boundaries = []
+        for i in range(1, n):
+            boundary = keys[i * len(keys) // n] if keys else b''
+            # a host can't be split across shards, so a very popular host
+            # may leave a shard empty
+            if not boundaries or boundary > boundaries[-1]:
+                boundaries.append(boundary)
+            else:
+                boundaries.append(boundaries[-1])
+        return cls(boundaries, shards, **options)
+
+    def shard_for_key(self, host_key):
+        """The shard whose range holds host_key."""
+        return self.shards[bisect.bisect_right(self.boundaries,
+                                               _toBytes(host_key))]
+
+def _toBytes(key):
+    return key if isinstance(key, bytes) else key.encode('utf-8')
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+
+# Copyright(c)2012-2013 Internet Archive. Software license AGPL version 3.
+#
+# This file is part of the `surt` python package.
+#
+#     surt is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU Affero General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     surt is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public License
+#     along with surt.  If not, see <http://www.gnu.org/licenses/>.
+#
+#     The surt source is hosted at https://github.com/internetarchive/surt
+
+"""Canonicalizer pipelines specialized for a fixed set of options.
+
+IAURLCanonicalizer.canonicalize() checks each of its flags on every url,
+and CompositeCanonicalizer passes the options to every stage as **kwargs.
+A CanonicalizerProfile does that work once: it takes the options and the
+list of canonicalizers up front and builds a list of steps holding only
+the enabled ones. It can be used anywhere surt() takes a canonicalizer:
+
+>>> profile = CanonicalizerProfile(query_lowercase=False, trailing_comma=True)
+>>> key = surt('http://archive.org/goo/?B=1', canonicalizer=profile)
+
+Options of the profile that control the output (surt, with_scheme,
+trailing_comma, ...) serve as defaults for surt(), and the call site may
+override them. The canonicalization options are fixed when the profile is
+built: surt() raises ValueError if the call site asks for a different
+value of one of them. Profiles can be pickled,
+e.g. to send them to worker processes, as long as any custom
+canonicalizers in them can be pickled.
+"""
+
+from __future__ import absolute_import
+
+import functools
+
+import surt.GoogleURLCanonicalizer as GoogleURLCanonicalizer
+import surt.IAURLCanonicalizer as IAURLCanonicalizer
+import surt.DefaultIAURLCanonicalizer as DefaultIAURLCanonicalizer
+from surt.hostcache import default_host_cache
+
+GOOGLE = 'google'
+IA = 'ia'
+DEFAULT = 'default'
+
+# The options the built-in steps read, with the defaults of the
+# canonicalize() functions
+_DEFAULTS = {
+    'host_resolve_ip': False,
+    'host_cache': default_host_cache,
+    'host_lowercase': True,
+    'host_massage': True,
+    'auth_strip_user': True,
+    'auth_strip_pass': True,
+    'port_strip_default': True,
+    'path_strip_empty': False,
+    'path_lowercase': True,
+    'path_strip_session_id': True,
+    'path_strip_trailing_slash_unless_empty': True,
+    'query_strip_session_id': True,
+    'query_lowercase': True,
+    'query_alpha_reorder': True,
+    'query_strip_empty': True,
+}
+
+_NAMES = {
+    GoogleURLCanonicalizer: GOOGLE,
+    GoogleURLCanonicalizer.canonicalize: GOOGLE,
+    IAURLCanonicalizer: IA,
+    IAURLCanonicalizer.canonicalize: IA,
+    DefaultIAURLCanonicalizer: DEFAULT,
+    DefaultIAURLCanonicalizer.canonicalize: DEFAULT,
+}
+
+class CanonicalizerProfile(object):
+    """canonicalizers is a list like the one surt() takes, and may also
+    name the built-in canonicalizers as 'google', 'ia' or 'default'. None
+    means the default canonicalizer, as in surt().
+    """
+    def __init__(self, canonicalizers=None, **options):
+        if canonicalizers is None:
+            canonicalizers = [DEFAULT]
+        elif not isinstance(canonicalizers, (list, tuple)):
+            canonicalizers = [canonicalizers]
+        self.canonicalizers = tuple(_NAMES.get(c, c) for c in canonicalizers)
+        self.options = options
+        self._fixed = fixed = dict(_DEFAULTS, **options)
+        self._steps = []
+        for canon in self.canonicalizers:
+            if canon == DEFAULT:
+                self._steps += _google_steps(fixed) + _ia_steps(fixed)
+            elif canon == GOOGLE:
+                self._steps += _google_steps(fixed)
+            elif canon == IA:
+                self._steps += _ia_steps(fixed)
+            else:
+                self._steps.append(
+                        functools.partial(_normalize(canon), **options))
+
+    def __call__(self, url, **_ignored):
+        # the options were applied when the steps were built, and surt()
+        # has checked the call site's against them; see check_options()
+        for step in self._steps:
+            url = step(url)
+        return url
+
+    def check_options(self, options):
+        """Raises ValueError if options, those of a call site, set a
+        canonicalization option to another value than the profile was
+        built with. Options of custom canonicalizers are not known here
+        and are not checked."""
+        for name, value in options.items():
+            if name in _DEFAULTS and value != self._fixed[name]:
+                raise ValueError(
+                        '%s=%r conflicts with %r; build a profile with the '
+                        'canonicalization options you need' % (
+                            name, value, self))
+
+    def __reduce__(self):
+        return _restore, (self.canonicalizers, self.options)
+
+    def __repr__(self):
+        return 'CanonicalizerProfile(%r, **%r)' % (
+                list(self.canonicalizers), self.options)
+
+def _restore(canonicalizers, options):
+    return CanonicalizerProfile(canonicalizers, **options)
+
+def _normalize(canonicalizer):
+    if hasattr(canonicalizer, '__call__'):
+        return canonicalizer
+    if hasattr(canonicalizer, 'canonicalize'):
+        return canonicalizer.canonicalize
+    raise AttributeError('canonicalizer must either be callable or have'
+                         ' "canonicalizer" method')
+
+# steps
+#_______________________________________________________________________________
+# Each step takes a handyurl and returns it, like a canonicalizer. The
+# options have the _DEFAULTS filled in.
+
+def _google_steps(options):
+    resolve_ip = options['host_resolve_ip']
+    host_cache = options['host_cache']
+    canonicalize = GoogleURLCanonicalizer.canonicalize
+    return [lambda url: canonicalize(url, resolve_ip, host_cache)]
+
+def _ia_steps(options):
+    get = options.get
+    steps = []
+
+    host_args = (get('host_lowercase'), get('host_massage'),
+                 get('auth_strip_user'), get('auth_strip_pass'),
+                 get('port_strip_default'), get('host_cache'))
+    if any(host_args[:5]):
+        canonicalizeHostPart = IAURLCanonicalizer.canonicalizeHostPart
+        steps.append(lambda url: canonicalizeHostPart(url, *host_args))
+
+    path_args = (get('path_strip_empty'),
+                 get('path_lowercase'),
+                 get('path_strip_session_id'),
+                 get('path_strip_trailing_slash_unless_empty'))
+    if any(path_args):
+        canonicalizePathPart = IAURLCanonicalizer.canonicalizePathPart
+        steps.append(lambda url: canonicalizePathPart(url, *path_args))
+
+    query_args = (get('query_strip_session_id'),
+                  get('query_lowercase'),
+                  get('query_alpha_reorder'),
+                  get('query_strip_empty'))
+    if any(query_args):
+        canonicalizeQueryPart = IAURLCanonicalizer.canonicalizeQueryPart
+        steps.append(lambda url: canonicalizeQueryPart(url, *query_args))
+
+    return steps
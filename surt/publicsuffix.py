@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+
+# Copyright(c)2012-2013 Internet Archive. Software license AGPL version 3.
+#
+# This file is part of the `surt` python package.
+#
+#     surt is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU Affero General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     surt is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public License
+#     along with surt.  If not, see <http://www.gnu.org/licenses/>.
+#
+#     The surt source is hosted at https://github.com/internetarchive/surt
+
+"""Offline Public Suffix List lookups.
+
+A snapshot of https://publicsuffix.org/list/public_suffix_list.dat is
+bundled with the package and compiled into a trie of reversed host labels
+the first time it is needed, so surt(public_suffix=True) never touches the
+network. Lookups give the same results as tldextract.extract() with its
+defaults, i.e. the private domains section of the list is ignored:
+
+>>> registered_domain(b'www.images.amazon.co.uk')
+b'amazon.co.uk'
+>>> subdomain(b'www.images.amazon.co.uk')
+b'www.images'
+
+To use a newer copy of the list:
+
+>>> psl = load_public_suffix_list('/path/to/public_suffix_list.dat')
+"""
+
+from __future__ import absolute_import
+
+import re
+
+from surt.hostcache import HostCache, DEFAULT_MAXSIZE, default_host_cache
+
+_END = None
+
+_RE_IPV4 = re.compile(
+    br'^(?:(?:25[0-5]|2[0-4][0-9]|1[0-9]{2}|[1-9]?[0-9])\.){3}'
+    br'(?:25[0-5]|2[0-4][0-9]|1[0-9]{2}|[1-9]?[0-9])$')
+
+# Full stops that tldextract treats like '.'
+_UNICODE_DOTS = (u'\u3002', u'\uff0e', u'\uff61')
+
+def _encode_label(label):
+    """Rules and host labels are matched in their ascii (punycode) form."""
+    label = label.lower()
+    try:
+        return label.encode('ascii')
+    except UnicodeEncodeError:
+        return b'xn--' + label.encode('punycode')
+
+def _text_labels(host):
+    for dot in _UNICODE_DOTS:
+        host = host.replace(dot, u'.')
+    labels = host.strip().rstrip(u'.').split(u'.')
+    return labels, [_encode_label(label) for label in labels]
+
+# PublicSuffixList
+#_______________________________________________________________________________
+class PublicSuffixList(object):
+    """The rules of a public suffix list, as a trie of reversed labels.
+
+    lines are the lines of a public_suffix_list.dat file, as text or bytes.
+    Results are memoized in a HostCache of cache_size entries.
+    """
+    def __init__(self, lines, include_private=False,
+                 cache_size=DEFAULT_MAXSIZE):
+        self._root = {}
+        self._cache = HostCache(cache_size)
+        private = False
+        for line in lines:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            line = line.strip()
+            if line.startswith(u'//'):
+                if u'===BEGIN PRIVATE DOMAINS===' in line:
+                    private = True
+                elif u'===END PRIVATE DOMAINS===' in line:
+                    private = False
+                continue
+            if line and (include_private or not private):
+                self.add_rule(line.split()[0])
+
+    @classmethod
+    def from_file(cls, path, include_private=False):
+        import io
+        with io.open(path, encoding='utf-8') as f:
+            return cls(f, include_private)
+
+    def add_rule(self, rule):
+        """Adds a rule like "co.uk", "*.ck" or "!www.ck"."""
+        node = self._root
+        for label in reversed(rule.split(u'.')):
+            if label.startswith(u'!'):
+                key = b'!' + _encode_label(label[1:])
+            else:
+                key = _encode_label(label)
+            node = node.setdefault(key, {})
+        node[_END] = True
+        self._cache.clear()
+
+    def _suffix_index(self, keys):
+        """Returns the index of the first label of the public suffix in keys,
+        or None if no rule matches. This follows tldextract's walk of the
+        trie, which stops at the first label that only a wildcard matches.
+        """
+        node = self._root
+        suffix_idx = label_idx = len(keys)
+        for key in reversed(keys):
+            child = node.get(key)
+            if child is not None:
+                label_idx -= 1
+                node = child
+                if _END in node:
+                    suffix_idx = label_idx
+                continue
+            if b'*' in node:
+                if b'!' + key in node:
+                    return label_idx
+                return label_idx - 1
+            break
+        if suffix_idx == len(keys):
+            return None
+        return suffix_idx
+
+    def split(self, host):
+        """Returns (subdomain, domain, suffix) of host, which may be text or
+        bytes. The parts are of the same type as host."""
+        return self._cache.call(self._split, host)
+
+    def _split(self, host):
+        if isinstance(host, bytes):
+            try:
+                host.decode('ascii')
+                labels = None
+            except UnicodeDecodeError:
+                try:
+                    labels, keys = _text_labels(host.decode('utf-8'))
+                    labels = [label.encode('utf-8') for label in labels]
+                except UnicodeError:
+                    labels = None
+            if labels is None:
+                host = host.strip().rstrip(b'.')
+                labels = host.split(b'.')
+                keys = host.lower().split(b'.')
+            dot = b'.'
+        else:
+            labels, keys = _text_labels(host)
+            dot = u'.'
+        empty = dot[:0]
+
+        i = self._suffix_index(keys)
+        if i is None:
+            if len(keys) == 4 and _RE_IPV4.match(b'.'.join(keys)):
+                return empty, dot.join(labels), empty
+            return dot.join(labels[:-1]), labels[-1], empty
+        return (dot.join(labels[:i - 1]) if i >= 2 else empty,
+                labels[i - 1] if i > 0 else empty,
+                dot.join(labels[i:]))
+
+    def registered_domain(self, host):
+        """The domain plus its public suffix, e.g. "amazon.co.uk" for
+        "www.amazon.co.uk". Empty if host is an ip address, a public suffix
+        itself, or has no known suffix."""
+        subdomain, domain, suffix = self.split(host)
+        if domain and suffix:
+            dot = b'.' if isinstance(suffix, bytes) else u'.'
+            return domain + dot + suffix
+        return suffix[:0]
+
+    def subdomain(self, host):
+        """The labels of host in front of its registered domain."""
+        return self.split(host)[0]
+
+
+# the default list
+#_______________________________________________________________________________
+_default_list = None
+
+def get_public_suffix_list():
+    """The list used by registered_domain() and subdomain(); the bundled
+    snapshot unless load_public_suffix_list() replaced it."""
+    global _default_list
+    if _default_list is None:
+        import pkgutil
+        data = pkgutil.get_data('surt', 'public_suffix_list.dat')
+        _default_list = PublicSuffixList(data.decode('utf-8').splitlines())
+    return _default_list
+
+def load_public_suffix_list(path, include_private=False):
+    """Replaces the default list with the public_suffix_list.dat file at
+    path and returns it.
+
+    This clears default_host_cache, which holds hosts shortened by the old
+    list; other HostCache instances used with public_suffix=True should be
+    cleared by the caller.
+    """
+    global _default_list
+    _default_list = PublicSuffixList.from_file(path, include_private)
+    default_host_cache.clear()
+    return _default_list
+
+def registered_domain(host):
+    return get_public_suffix_list().registered_domain(host)
+
+def subdomain(host):
+    return get_public_suffix_list().subdomain(host)
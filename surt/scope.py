@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+
+# Copyright(c)2012-2013 Internet Archive. Software license AGPL version 3.
+#
+# This file is part of the `surt` python package.
+#
+#     surt is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU Affero General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     surt is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public License
+#     along with surt.  If not, see <http://www.gnu.org/licenses/>.
+#
+#     The surt source is hosted at https://github.com/internetarchive/surt
+
+"""Matching urls against SURT prefix rules, as in crawl scopes and
+exclusion lists.
+
+A rule is a SURT prefix such as "http://(org,archive,)/details/", in which
+case a url matches it if the key of the url starts with it, or a plain url
+or domain that surt_prefixes() turns into SURT prefixes with the same
+canonicalizer as the keys:
+
+  archive.org, *.archive.org,     http://(org,archive,  the domain and all
+  http://archive.org/                                   of its subdomains
+  http://archive.org/details/     http://(org,archive,)/details/
+  +http://(org,archive,           a SURT prefix, written as is (the "+"
+                                  marks it as one, as in Heritrix scopes)
+
+SurtPrefixMatcher compiles the rules into a trie whose edges are the
+components of the key: the scheme, each host label with its comma, and
+then the path and query a segment at a time. Finding the longest rule
+that matches a key takes one dict lookup per component, however many
+rules there are:
+
+>>> scope = SurtPrefixMatcher(['archive.org', 'http://example.com/private/'])
+>>> scope.longest_match('http://web.archive.org/web/')
+'archive.org'
+"""
+
+from __future__ import absolute_import
+
+import re
+
+from surt.surt import surt, iter_surt, _resolve_canonicalizer, _default_options
+
+# keys and rules are cut into components after each of these
+_COMPONENT = re.compile(br'[^(),/?&=]*[(),/?&=]|[^(),/?&=]+')
+_DELIMITERS = b'(),/?&='
+
+_DEFAULT_OPTIONS = dict(with_scheme=True, trailing_comma=True)
+
+# surt_prefixes()
+#_______________________________________________________________________________
+def surt_prefixes(rule, canonicalizer=None, **options):
+    """Returns the list of SURT prefixes (bytes) that rule stands for; see
+    the module docstring for the kinds of rules. options are passed to
+    surt() and default to with_scheme=True and trailing_comma=True, the
+    form of the SURT prefixes in Heritrix scopes.
+
+    A url with a path gives its key, with the trailing slash kept. A url
+    without one, or a domain, gives the prefix of the domain: one prefix
+    with trailing_comma, two ("...)" and "...,") without.
+    """
+    options = dict(_DEFAULT_OPTIONS, **options)
+    if not isinstance(rule, bytes):
+        rule = bytes(rule) if isinstance(rule, (bytearray, memoryview)) else (
+                rule.encode('utf-8'))
+    rule = rule.strip()
+    if rule.startswith(b'+'):
+        return [rule[1:]]
+    if rule.startswith(b'(') or b'://(' in rule:
+        return [rule]
+
+    if b'://' not in rule:
+        rule = b'http://' + rule
+    scheme_end = rule.index(b'://') + 3
+    if rule[scheme_end:scheme_end+2] == b'*.':
+        rule = rule[:scheme_end] + rule[scheme_end+2:]
+    if rule.endswith(b'*'):
+        rule = rule[:-1]
+
+    key = surt(rule, canonicalizer, **options)
+    if key.endswith(b')/'):
+        # no path: the domain
+        host = key[:-2]
+        if host.endswith(b','):
+            return [host]
+        return [host + b')', host + b',']
+    if rule.endswith(b'/') and not key.endswith(b'/'):
+        key += b'/'
+    return [key]
+
+def _components(key):
+    return _COMPONENT.findall(key)
+
+class _Node(object):
+    __slots__ = ('children', 'partials', 'partial_lengths', 'value',
+                 'has_value')
+
+    def __init__(self):
+        self.children = {}
+        # rules that end in the middle of a component: {bytes: value}, and
+        # their distinct lengths, longest first
+        self.partials = None
+        self.partial_lengths = None
+        self.value = None
+        self.has_value = False
+
+# SurtPrefixMatcher
+#_______________________________________________________________________________
+class SurtPrefixMatcher(object):
+    """A set of SURT prefix rules, compiled for longest prefix matching.
+
+    Each rule has a value, by default the rule as it was given, and the
+    match methods return the value of the longest matching rule, or None.
+    The canonicalizer and options are those of the keys; they default to
+    with_scheme=True and trailing_comma=True. With coerce_https (the
+    default, as in Heritrix) https keys and rules are matched as http.
+    """
+    def __init__(self, rules=(), canonicalizer=None, coerce_https=True,
+                 **options):
+        self.canonicalizer = _resolve_canonicalizer(canonicalizer)
+        self.options = _default_options(
+                self.canonicalizer, dict(_DEFAULT_OPTIONS, **options))
+        self.coerce_https = coerce_https
+        self._root = _Node()
+        self._len = 0
+        for rule in rules:
+            self.add(rule)
+
+    def __len__(self):
+        return self._len
+
+    def add(self, rule, value=None):
+        """Adds a rule: a plain url or domain, or a SURT prefix."""
+        if value is None:
+            value = rule
+        for prefix in surt_prefixes(rule, self.canonicalizer, **self.options):
+            self.add_prefix(prefix, value)
+
+    def add_prefix(self, prefix, value):
+        """Adds the SURT prefix (bytes) as is. A prefix that was added
+        before gets the new value."""
+        prefix = self._coerce(prefix)
+        node = self._root
+        components = _components(prefix)
+        last = components[-1:] or [b'']
+        if last[0] and last[0][-1:] not in _DELIMITERS:
+            components.pop()
+        else:
+            last = None
+        for component in components:
+            child = node.children.get(component)
+            if child is None:
+                child = node.children[component] = _Node()
+            node = child
+        if last is None:
+            if not node.has_value:
+                self._len += 1
+            node.value, node.has_value = value, True
+            return
+        if node.partials is None:
+            node.partials = {}
+            node.partial_lengths = []
+        partial = last[0]
+        if partial not in node.partials:
+            self._len += 1
+            if len(partial) not in node.partial_lengths:
+                node.partial_lengths.append(len(partial))
+                node.partial_lengths.sort(reverse=True)
+        node.partials[partial] = value
+
+    def longest_match_key(self, key):
+        """The value of the longest rule that the SURT key (bytes) starts
+        with, or None."""
+        key = self._coerce(key)
+        node = self._root
+        best = node.value
+        # lazily, as most keys leave the trie long before their end
+        for match in _COMPONENT.finditer(key):
+            component = match.group()
+            if node.partials:
+                # no longer than the component, so at most one lookup
+                # per byte of it
+                partials = node.partials
+                for length in node.partial_lengths:
+                    if length <= len(component):
+                        partial = component[:length]
+                        if partial in partials:
+                            best = partials[partial]
+                            break
+            node = node.children.get(component)
+            if node is None:
+                return best
+            if node.has_value:
+                best = node.value
+        return best
+
+    def longest_match(self, url):
+        """The value of the longest rule that matches url, or None."""
+        return self.longest_match_key(
+                surt(url, self.canonicalizer, **self.options))
+
+    def matches(self, url):
+        """Whether any rule matches url."""
+        return self.longest_match(url) is not None
+
+    def match_many(self, urls):
+        """The longest_match() of each of urls, as a list."""
+        match = self.longest_match_key
+        return [match(key) for key in iter_surt(
+                urls, self.canonicalizer, **self.options)]
+
+    def _coerce(self, key):
+        if not isinstance(key, bytes):
+            key = key.encode('utf-8')
+        if self.coerce_https and key.startswith(b'https://'):
+            return b'http://' + key[8:]
+        return key
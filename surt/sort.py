@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+
+# Copyright(c)2012-2013 Internet Archive. Software license AGPL version 3.
+#
+# This file is part of the `surt` python package.
+#
+#     surt is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU Affero General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     surt is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public License
+#     along with surt.  If not, see <http://www.gnu.org/licenses/>.
+#
+#     The surt source is hosted at https://github.com/internetarchive/surt
+
+"""External merge sort of urls or CDX lines by their SURT key.
+
+sort_stream() computes the key of every line in a pool of worker
+processes, which also sort the chunks they key. Sorted chunks are held in
+memory up to memory_limit bytes, then merged and spilled to a run file
+on disk. At the end all runs are k-way merged into the output, in the
+same order as "LC_ALL=C sort" of the keyed lines, optionally keeping only
+the first line of each key.
+
+The input is one of
+
+  urls  a url per line, or the url_field'th space separated field of
+        each line (e.g. 3 for a Heritrix crawl.log); the output lines are
+        "<key> <input line>", with a key of "-" for a line without the
+        field or with a url that surt() rejects
+  cdx   CDX lines, written out with their key field recomputed as by
+  cdxj  surt-cdx
+
+Usage: surt-sort [options] [input [output]]
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import os
+import sys
+import heapq
+import tempfile
+import argparse
+import collections
+
+from surt.surt import surt_many
+from surt.profile import CanonicalizerProfile
+from surt.cdx import CDX, CDXJ
+from surt.cdx import rekey_lines, _read_head, _read_chunks, _surt_or_none
+
+URLS = 'urls'
+
+DEFAULT_MEMORY_LIMIT = 512 * 1024 * 1024
+DEFAULT_MAX_MERGE = 64
+
+# a rough guess of what a bytes line costs on top of its length
+_LINE_OVERHEAD = 64
+
+# worker process
+#_______________________________________________________________________________
+_worker_args = None
+
+def _init_worker(format, key_field, url_field, options):
+    global _worker_args
+    options = dict(canonicalizer=CanonicalizerProfile(**options))
+    _worker_args = (format, key_field, url_field, options)
+
+def _sort_chunk(lines):
+    """Returns the lines of the chunk, keyed and sorted."""
+    format, key_field, url_field, options = _worker_args
+    if format == URLS:
+        lines = [line.rstrip(b'\r\n') for line in lines]
+        lines = [line for line in lines if line.strip()]
+        # a line without the field keys as b'-', like an empty url
+        urls = [_field(line, url_field) or b'' for line in lines]
+        try:
+            keys = surt_many(urls, **options)
+        except Exception:
+            # a url surt() rejects keys as b'-' too, rather than ending
+            # the sort
+            keys = [_surt_or_none(url, options) or b'-' for url in urls]
+        keyed = [key + b' ' + line + b'\n' for key, line in zip(keys, lines)]
+    else:
+        keyed = rekey_lines(lines, format, key_field, url_field, **options)
+        keyed = [line if line.endswith(b'\n') else line + b'\n'
+                 for line in keyed if line.strip()]
+    keyed.sort()
+    return keyed
+
+def _field(line, index):
+    fields = line.split(None, index + 1)
+    return fields[index] if len(fields) > index else None
+
+# runs
+#_______________________________________________________________________________
+def _key(line):
+    return line.split(b' ', 1)[0].rstrip(b'\r\n')
+
+def _unique(lines):
+    """Drops the lines with the same key as the line before them."""
+    prev = None
+    for line in lines:
+        key = _key(line)
+        if key != prev:
+            yield line
+        prev = key
+
+def _writeRun(lines, tmpdir):
+    fd, path = tempfile.mkstemp(prefix='surt-sort-', suffix='.run',
+                                dir=tmpdir)
+    with os.fdopen(fd, 'wb', 1 << 20) as f:
+        f.writelines(lines)
+    return path
+
+def _readRun(path):
+    with open(path, 'rb', 1 << 20) as f:
+        for line in f:
+            yield line
+
+def _merge(streams, unique):
+    merged = heapq.merge(*streams)
+    return _unique(merged) if unique else merged
+
+# sort_stream()
+#_______________________________________________________________________________
+def sort_stream(instream, outstream, format=URLS, url_field=0,
+                memory_limit=DEFAULT_MEMORY_LIMIT, workers=None,
+                chunk_size=10000, tmpdir=None, unique=False,
+                max_merge=DEFAULT_MAX_MERGE, **options):
+    """Reads lines from the binary instream and writes them, keyed and
+    sorted by key, to the binary outstream. options are passed to surt().
+
+    url_field is the field of the url in a urls input line. A cdx input
+    takes its key and url fields from its " CDX ..." header, as surt-cdx
+    does, or has the default 11-field layout if it has none.
+
+    memory_limit is the approximate number of bytes of sorted lines held
+    in memory before they are spilled to a run file in tmpdir (default:
+    the system temporary directory); on top of that up to 2 * workers
+    chunks of chunk_size lines are being keyed at any time. With
+    unique=True only the first line of each key is written. If there are
+    more than max_merge runs, they are merged into fewer, longer runs
+    before the final merge, so that at most max_merge files are open.
+
+    Returns (lines written, runs spilled).
+    """
+    held = []
+    held_bytes = [0]
+    runs = []
+
+    def record(lines):
+        held.append(lines)
+        held_bytes[0] += sum(len(line) for line in lines) + (
+                _LINE_OVERHEAD * len(lines))
+        if held_bytes[0] >= memory_limit:
+            runs.append(_writeRun(_merge(held, unique), tmpdir))
+            del held[:]
+            held_bytes[0] = 0
+
+    try:
+        if format == URLS:
+            key_field = None
+            chunks = _read_chunks(instream, chunk_size)
+        else:
+            # the fields of a " CDX ..." header hold for the whole file
+            head, format, key_field, url_field = _read_head(instream, format)
+            chunks = _read_chunks(instream, chunk_size, head)
+        args = (format, key_field, url_field, options)
+        if workers == 1:
+            _init_worker(*args)
+            for chunk in chunks:
+                record(_sort_chunk(chunk))
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            workers = workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                     initargs=args) as executor:
+                pending = collections.deque()
+                for chunk in chunks:
+                    pending.append(executor.submit(_sort_chunk, chunk))
+                    if len(pending) >= 2 * workers:
+                        record(pending.popleft().result())
+                while pending:
+                    record(pending.popleft().result())
+
+        spilled = len(runs)
+        while len(runs) > max_merge:
+            group = runs[:max_merge]
+            merged = _writeRun(_merge([_readRun(path) for path in group],
+                                      unique), tmpdir)
+            for path in group:
+                os.unlink(path)
+            runs = runs[max_merge:] + [merged]
+
+        written = 0
+        streams = [_readRun(path) for path in runs] + held
+        for line in _merge(streams, unique):
+            outstream.write(line)
+            written += 1
+        return written, spilled
+    finally:
+        for path in runs:
+            if os.path.exists(path):
+                os.unlink(path)
+
+# main()
+#_______________________________________________________________________________
+_SIZE_SUFFIXES = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+
+def parse_size(size):
+    """Parses a size like "512M" or "2G" (powers of 1024) into bytes."""
+    size = size.strip().upper().rstrip('B')
+    if size and size[-1] in _SIZE_SUFFIXES:
+        return int(float(size[:-1]) * _SIZE_SUFFIXES[size[-1]])
+    return int(size)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+            prog='surt-sort',
+            description='Sort urls or CDX lines by their SURT key.')
+    parser.add_argument('input', nargs='?', default='-',
+                        help='input file (default: stdin)')
+    parser.add_argument('output', nargs='?', default='-',
+                        help='output file (default: stdout)')
+    parser.add_argument('-f', '--format', choices=[URLS, CDX, CDXJ],
+                        default=URLS, help='input format (default: urls)')
+    parser.add_argument('-k', '--url-field', type=int, default=0,
+                        help='field of the url in a urls input line, '
+                             'counting from 0 (default: 0)')
+    parser.add_argument('-S', '--buffer-size', type=parse_size,
+                        default=DEFAULT_MEMORY_LIMIT,
+                        help='memory for sorted lines before spilling to '
+                             'disk, e.g. 2G (default: 512M)')
+    parser.add_argument('-T', '--temporary-directory', default=None,
+                        help='directory for the run files')
+    parser.add_argument('-u', '--unique', action='store_true',
+                        help='write only the first line of each key')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='number of worker processes (default: number '
+                             'of cpus)')
+    parser.add_argument('-c', '--chunk-size', type=int, default=10000,
+                        help='lines per chunk sent to a worker')
+    parser.add_argument('--with-scheme', action='store_true')
+    parser.add_argument('--trailing-comma', action='store_true')
+    parser.add_argument('--public-suffix', action='store_true')
+    parser.add_argument('--no-host-massage', dest='host_massage',
+                        action='store_false')
+    parser.add_argument('--no-reverse-ipaddr', dest='reverse_ipaddr',
+                        action='store_false')
+    args = parser.parse_args(argv)
+
+    options = dict(with_scheme=args.with_scheme,
+                   trailing_comma=args.trailing_comma,
+                   public_suffix=args.public_suffix,
+                   host_massage=args.host_massage,
+                   reverse_ipaddr=args.reverse_ipaddr)
+
+    stdin = getattr(sys.stdin, 'buffer', sys.stdin)
+    stdout = getattr(sys.stdout, 'buffer', sys.stdout)
+    instream = stdin if args.input == '-' else open(args.input, 'rb')
+    outstream = stdout if args.output == '-' else open(args.output, 'wb')
+    try:
+        sort_stream(instream, outstream, format=args.format,
+                    url_field=args.url_field, memory_limit=args.buffer_size,
+                    workers=args.workers, chunk_size=args.chunk_size,
+                    tmpdir=args.temporary_directory, unique=args.unique,
+                    **options)
+    finally:
+        if instream is not stdin:
+            instream.close()
+        if outstream is not stdout:
+            outstream.close()
+        else:
+            outstream.flush()
+
+if __name__ == '__main__':
+    main()
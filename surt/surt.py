@@ -28,8 +28,12 @@ from __future__ import absolute_import
 
 from surt.handyurl import handyurl
 from surt.URLRegexTransformer import hostToSURT
+from surt.hostcache import default_host_cache
+from surt.profile import CanonicalizerProfile
 
 import surt.DefaultIAURLCanonicalizer as DefaultIAURLCanonicalizer
+import surt.GoogleURLCanonicalizer as GoogleURLCanonicalizer
+import surt.IAURLCanonicalizer as IAURLCanonicalizer
 
 class CompositeCanonicalizer(object):
     def __init__(self, canonicalizers):
@@ -37,9 +41,20 @@ class CompositeCanonicalizer(object):
             self._normalize(canon) for canon in canonicalizers
             ]
     def __call__(self, hurl, **options):
+        if options.get('stage_timer') is not None:
+            return self._callTimed(hurl, options)
         for canon in self.canonicalizers:
             hurl = canon(hurl, **options)
         return hurl
+    def _callTimed(self, hurl, options):
+        """Records each canonicalizer as a stage of the stage_timer"""
+        timer = options['stage_timer']
+        clock = timer.clock
+        for canon in self.canonicalizers:
+            start = clock()
+            hurl = canon(hurl, **options)
+            timer.record(_stageName(canon), clock() - start)
+        return hurl
     @staticmethod
     def _normalize(canonicalizer):
         if hasattr(canonicalizer, '__call__'):
@@ -52,7 +67,9 @@ class CompositeCanonicalizer(object):
 # surt()
 #_______________________________________________________________________________
 def surt(url, canonicalizer=None, **options):
-    if isinstance(url, bytes):
+    """Returns the SURT key of url. Bytes, bytearray and memoryview urls
+    give bytes keys, text urls give text keys."""
+    if isinstance(url, _BYTES_TYPES):
         return _surt_bytes(url, canonicalizer, **options)
     else:
         if url is not None:
@@ -60,23 +77,407 @@ def surt(url, canonicalizer=None, **options):
         return _surt_bytes(url, canonicalizer, **options).decode('utf-8')
 
 def _surt_bytes(url, canonicalizer, **options):
-    if not url:
-        return b"-"
+    canonicalizer = _resolve_canonicalizer(canonicalizer)
+    options = _default_options(canonicalizer, options)
+    return _surt_function(options)(url, canonicalizer, options)
 
-    if url.startswith(b"filedesc"):
-        return url
+def _stageName(canonicalizer):
+    name = _STAGE_NAMES.get(canonicalizer)
+    if name is None:
+        name = getattr(canonicalizer, '__name__', None)
+    if name is None:
+        name = type(canonicalizer).__name__
+    return name
+
+_STAGE_NAMES = {
+    DefaultIAURLCanonicalizer.canonicalize: 'default',
+    GoogleURLCanonicalizer.canonicalize: 'google',
+    IAURLCanonicalizer.canonicalize: 'ia',
+}
 
+def _resolve_canonicalizer(canonicalizer):
     if canonicalizer is None:
-        canonicalizer = DefaultIAURLCanonicalizer.canonicalize
-    else:
-        if isinstance(canonicalizer, (list, tuple)):
-            canonicalizer = CompositeCanonicalizer(canonicalizer)
-        elif (not hasattr(canonicalizer, '__call__') and
-              hasattr(canonicalizer, 'canonicalize')):
-            canonicalizer = canonicalizer.canonicalize
+        return DefaultIAURLCanonicalizer.canonicalize
+    if isinstance(canonicalizer, (list, tuple)):
+        return CompositeCanonicalizer(canonicalizer)
+    if (not hasattr(canonicalizer, '__call__') and
+          hasattr(canonicalizer, 'canonicalize')):
+        return canonicalizer.canonicalize
+    return canonicalizer
 
+def _default_options(canonicalizer, options):
+    """Returns options with the defaults filled in. The options of a
+    CanonicalizerProfile are defaults too, and must not be contradicted."""
+    if isinstance(canonicalizer, CanonicalizerProfile):
+        canonicalizer.check_options(options)
+        options = dict(canonicalizer.options, **options)
     options.setdefault('surt', True)
     options.setdefault('with_scheme', False)
+    options.setdefault('host_cache', default_host_cache)
+    return options
+
+_BYTES_TYPES = (bytes, bytearray, memoryview)
+
+# iter_surt()
+#_______________________________________________________________________________
+def iter_surt(urls, canonicalizer=None, **options):
+    """Generator form of surt() for any iterable of urls.
+
+    The canonicalizer and the options are resolved once for the whole batch
+    rather than once per url. Whether the batch is bytes or text is decided
+    by its first url that is not None: a bytes batch yields bytes keys, a
+    text batch yields text keys, exactly as surt() would for each url. Don't
+    mix bytes and text urls in one batch.
+    """
+    canonicalizer = _resolve_canonicalizer(canonicalizer)
+    options = _default_options(canonicalizer, options)
+    surt_bytes = _surt_function(options)
+
+    # None urls ahead of the first real one can't tell us the type of the
+    # batch, so hold on to them until we know which kind of "-" to emit.
+    pending = 0
+    urls = iter(urls)
+    for url in urls:
+        if url is None:
+            pending += 1
+        elif isinstance(url, _BYTES_TYPES):
+            for _ in range(pending):
+                yield b"-"
+            yield surt_bytes(url, canonicalizer, options)
+            for url in urls:
+                yield surt_bytes(url, canonicalizer, options)
+            return
+        else:
+            for _ in range(pending):
+                yield "-"
+            yield _surt_text(url, canonicalizer, options, surt_bytes)
+            for url in urls:
+                yield _surt_text(url, canonicalizer, options, surt_bytes)
+            return
+
+    for _ in range(pending):
+        yield "-"
+
+# surt_many()
+#_______________________________________________________________________________
+def surt_many(urls, canonicalizer=None, **options):
+    """Batch form of surt(): takes a sequence of urls and returns a list of
+    their keys, in the same order. See iter_surt().
+    """
+    return list(iter_surt(urls, canonicalizer, **options))
+
+def _surt_text(url, canonicalizer, options, surt_bytes):
+    if url is not None:
+        url = url.encode('utf-8')
+    return surt_bytes(url, canonicalizer, options).decode('utf-8')
+
+def _surt_function(options):
+    """_surt_resolved(), or _surt_timed() if a stage_timer is set"""
+    if options.get('stage_timer') is not None:
+        return _surt_timed
+    return _surt_resolved
+
+def _surt_resolved(url, canonicalizer, options):
+    """The canonicalizer must already be resolved and the default options
+    already set; see _resolve_canonicalizer() and _default_options()."""
+    if not url:
+        return b"-"
+
+    if not isinstance(url, bytes):
+        url = bytes(url)
+
+    if url.startswith(b"filedesc"):
+        return url
 
     hurl = canonicalizer(handyurl.parse(url), **options)
     return hurl.geturl_bytes(**options)
+
+def _surt_timed(url, canonicalizer, options):
+    """_surt_resolved() with its stages recorded by options['stage_timer'];
+    see surt.timing."""
+    timer = options['stage_timer']
+    clock = timer.clock
+    timer.start_url()
+    start = clock()
+    if url and not isinstance(url, bytes):
+        url = bytes(url)
+
+    if not url or url.startswith(b"filedesc"):
+        key = _surt_resolved(url, canonicalizer, options)
+    else:
+        hurl = handyurl.parse(url)
+        t = clock()
+        timer.record('parse', t - start)
+        hurl = canonicalizer(hurl, **options)
+        start_stage, t = t, clock()
+        timer.record('canonicalize', t - start_stage)
+        key = hurl.geturl_bytes(**options)
+        timer.record('output', clock() - t)
+
+    timer.end_url(url, clock() - start)
+    return key
+
+# surt_range()
+#_______________________________________________________________________________
+MATCH_TYPES = ('exact', 'prefix', 'host', 'domain')
+
+def surt_range(url, match_type=None, canonicalizer=None, **options):
+    """Returns (start, end) such that the SURT keys that match url are
+    exactly the keys k with start <= k < end, so that a sorted index can
+    be searched with two bisections. The keys are made by surt() with the
+    same canonicalizer and options, and have the type that it returns.
+
+    match_type is one of
+
+      exact   the key of url itself
+      prefix  keys that start with the key of url, e.g. everything under
+              http://archive.org/details/. A trailing slash is kept, so
+              that this does not match /detailsfoo; the canonical key of
+              /details/ itself is org,archive)/details, which only an
+              exact match finds.
+      host    every url on the host of url (with the same port, if any)
+
+    If match_type is None it is taken from the url: http://archive.org/
+    details/* is a prefix match, anything else an exact match. The
+    wildcard is not part of the key either way.
+
+    The keys of a domain match do not form a single range, see
+    surt_ranges(), and raise ValueError here.
+
+    >>> surt_range('http://archive.org/details/', 'prefix')
+    ('org,archive)/details/', 'org,archive)/details0')
+    """
+    ranges = surt_ranges(url, match_type, canonicalizer, **options)
+    if len(ranges) != 1:
+        raise ValueError('%r is a domain match, which spans %d key ranges; '
+                         'use surt_ranges()' % (url, len(ranges)))
+    return ranges[0]
+
+# surt_ranges()
+#_______________________________________________________________________________
+def surt_ranges(url, match_type=None, canonicalizer=None, **options):
+    """Returns the sorted, disjoint [(start, end), ...] ranges of the SURT
+    keys that match url. The match types and patterns are those of
+    surt_range(), plus
+
+      domain  every url on the host of url and on its subdomains, on any
+              port
+
+    which *.archive.org asks for when match_type is None. A domain match
+    is two ranges, as the keys of the domain on another port (with ":")
+    sort apart from those of its subdomains (with ","); every other match
+    is one.
+
+    >>> surt_ranges('*.archive.org')
+    [('org,archive)', 'org,archive-'), ('org,archive:', 'org,archive;')]
+    """
+    if isinstance(url, _BYTES_TYPES):
+        return _surt_ranges_bytes(bytes(url), match_type, canonicalizer,
+                                  options)
+    return [(start.decode('utf-8'), end.decode('utf-8'))
+            for start, end in _surt_ranges_bytes(url.encode('utf-8'),
+                                                 match_type, canonicalizer,
+                                                 options)]
+
+def _surt_ranges_bytes(url, match_type, canonicalizer, options):
+    scheme_end = url.find(b'://') + 3 if b'://' in url else 0
+    if match_type in (None, 'domain') and url[scheme_end:scheme_end+2] == b'*.':
+        url = url[:scheme_end] + url[scheme_end+2:]
+        match_type = 'domain'
+    elif match_type in (None, 'prefix') and url.endswith(b'*'):
+        url = url[:-1]
+        match_type = 'prefix'
+    elif match_type is None:
+        match_type = 'exact'
+    if match_type not in MATCH_TYPES:
+        raise ValueError('match_type must be one of %s, not %r' % (
+            ', '.join(MATCH_TYPES), match_type))
+
+    key = surt(url, canonicalizer, **options)
+
+    if match_type == 'exact':
+        # b'\0' sorts right after the end of key and before anything else
+        return [(key, key + b'\0')]
+
+    if match_type == 'prefix':
+        # the canonicalizer drops trailing slashes and empty queries, but
+        # a prefix that ends in one should not match more than it says
+        if url.endswith(b'/') and not key.endswith(b'/'):
+            key += b'/'
+        elif url.endswith(b'?') and not key.endswith(b'?'):
+            key += b'?'
+        return [(key, _prefixEnd(key))]
+
+    # key is [scheme://(]host[:port][,])/path
+    host_end = key.find(b')')
+    if host_end < 0:
+        raise ValueError('%r has no host to match' % url)
+
+    if match_type == 'host':
+        host = key[:host_end+1]
+        return [(host, _prefixEnd(host))]
+
+    # domain: the host without the port and the trailing comma. Its keys
+    # continue with ")" or "," (a subdomain, or the trailing comma), and
+    # nothing sorts between those but "*" and "+", which hosts don't have;
+    # the domain itself on another port continues with ":", further on
+    host_start = key.rfind(b'(', 0, host_end) + 1
+    domain = key[host_start:host_end].rstrip(b',')
+    port = domain.find(b':')
+    if port >= 0:
+        domain = domain[:port]
+    domain = key[:host_start] + domain
+    return [(domain + b')', domain + b'-'), (domain + b':', domain + b';')]
+
+def _prefixEnd(prefix):
+    """The smallest bytes string greater than all that start with prefix"""
+    prefix = prefix.rstrip(b'\xff')
+    if not prefix:
+        raise ValueError('no keys sort after the prefix')
+    return prefix[:-1] + bytearray((bytearray(prefix[-1:])[0] + 1,))
+
+# surt_host_key()
+#_______________________________________________________________________________
+def surt_host_key(url, **options):
+    """Returns the SURT key of url up to the end of its host, e.g.
+    "org,archive)" for "http://www.archive.org/details/x?a=1", as a shard
+    router needs it.
+
+    Only the host steps of GoogleURLCanonicalizer and IAURLCanonicalizer
+    run, with the same options as surt() and the same host_cache, so the
+    result is always the start of surt(url, **options), up to and
+    including the ")". The path and the query are never looked at. Urls
+    without a host (dns:, filedesc: etc.) give their whole key.
+    """
+    if isinstance(url, _BYTES_TYPES):
+        return _surt_host_key_bytes(url, options)
+    if url is not None:
+        url = url.encode('utf-8')
+    return _surt_host_key_bytes(url, options).decode('utf-8')
+
+def _surt_host_key_bytes(url, options):
+    canonicalizer = DefaultIAURLCanonicalizer.canonicalize
+    options = _default_options(canonicalizer, options)
+    if not url:
+        return b"-"
+    if not isinstance(url, bytes):
+        url = bytes(url)
+    if url.startswith(b"filedesc"):
+        return url
+
+    hurl = handyurl.parse(url)
+    if not hurl.host:
+        return _surt_resolved(url, canonicalizer, options)
+
+    GoogleURLCanonicalizer.canonicalizeHostPart(hurl, **options)
+    IAURLCanonicalizer.canonicalizeHostPart(hurl, **options)
+
+    if hurl.host:
+        key = hurl.gethost_bytes(**options)
+        if key.endswith(b')') or not options['surt']:
+            return key
+    # canonicalization, or public_suffix on an ip address, left no host,
+    # so the key has no host part
+    return _surt_resolved(url, canonicalizer, options)
+
+# surt_into()
+#_______________________________________________________________________________
+def surt_into(url, out, canonicalizer=None, **options):
+    """Appends the SURT key of url to the bytearray out, so that bulk
+    writers can collect many keys in one reusable buffer and write it out
+    in one go. The key is always appended as bytes, whatever the type of
+    url. Nothing else (no separator) is appended.
+
+    >>> buf = bytearray()
+    >>> surt_into(b'http://archive.org/', buf)
+    >>> surt_into('http://example.com/', buf, trailing_comma=True)
+    >>> bytes(buf)
+    b'org,archive)/com,example,)/'
+    """
+    if url and not isinstance(url, bytes):
+        if isinstance(url, (bytearray, memoryview)):
+            url = bytes(url)
+        else:
+            url = url.encode('utf-8')
+
+    canonicalizer = _resolve_canonicalizer(canonicalizer)
+    options = _default_options(canonicalizer, options)
+    if options.get('stage_timer') is not None:
+        out.extend(_surt_timed(url, canonicalizer, options))
+        return
+
+    if not url:
+        out.extend(b"-")
+    elif url.startswith(b"filedesc"):
+        out.extend(url)
+    else:
+        hurl = canonicalizer(handyurl.parse(url), **options)
+        hurl.geturl_into(out, **options)
+
+# surt_column()
+#_______________________________________________________________________________
+def surt_column(data, offsets, canonicalizer=None, offsets_typecode='q',
+                offsets_format=None, **options):
+    """Keys a column of urls held Arrow-style: the urls one after the
+    other in the buffer data, url i being data[offsets[i]:offsets[i+1]].
+
+    data and offsets can be anything with the buffer protocol, e.g. bytes
+    and array.array, numpy arrays, or the buffers of a pyarrow binary or
+    string array. Typed offsets (array.array, numpy) carry their integer
+    type; offsets in an untyped byte buffer, such as pyarrow's
+    Array.buffers()[1], need offsets_format to tell it: 'i' for int32
+    (binary, string), 'q' for int64 (large_binary, large_string). Byte
+    offsets without offsets_format raise TypeError, as they would
+    otherwise be read one byte per offset.
+
+    Returns the keys in the same layout, as (bytearray,
+    array.array(offsets_typecode)), both of which numpy and pyarrow can
+    wrap without copying: 'q' gives int64 offsets (pyarrow large_binary),
+    'i' int32 offsets (pyarrow binary).
+
+    No list of urls or keys is built: each url is sliced out of data, keyed
+    and appended to the output buffer in turn. Empty urls, which is what
+    Arrow null slots usually hold, become "-" without being parsed.
+    """
+    from array import array
+
+    data = memoryview(data)
+    if data.ndim != 1 or data.format not in ('B', 'b', 'c'):
+        data = data.cast('B')
+    offsets = memoryview(offsets)
+    if offsets.format in ('B', 'b', 'c'):
+        if offsets_format is None:
+            raise TypeError('offsets is a byte buffer; pass offsets_format='
+                            "'i' or 'q' to say how to read it")
+        offsets = offsets.cast('B').cast(offsets_format)
+
+    canonicalizer = _resolve_canonicalizer(canonicalizer)
+    options = _default_options(canonicalizer, options)
+    out = bytearray()
+    out_offsets = array(offsets_typecode, [0])
+    append = out_offsets.append
+    if options.get('stage_timer') is not None:
+        surt_bytes = _surt_function(options)
+        for url in _iterColumn(data, offsets):
+            out += surt_bytes(url, canonicalizer, options)
+            append(len(out))
+        return out, out_offsets
+
+    parse = handyurl.parse
+    for url in _iterColumn(data, offsets):
+        if not url:
+            out += b"-"
+        elif url.startswith(b"filedesc"):
+            out += url
+        else:
+            out += canonicalizer(parse(url), **options).geturl_bytes(**options)
+        append(len(out))
+    return out, out_offsets
+
+def _iterColumn(data, offsets):
+    """Yields the urls of a column as bytes, b'' for empty ones."""
+    offsets = iter(offsets)
+    start = next(offsets, None)
+    for end in offsets:
+        yield data[start:end].tobytes() if end > start else b''
+        start = end
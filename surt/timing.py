@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+# Copyright(c)2012-2013 Internet Archive. Software license AGPL version 3.
+#
+# This file is part of the `surt` python package.
+#
+#     surt is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU Affero General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     surt is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public License
+#     along with surt.  If not, see <http://www.gnu.org/licenses/>.
+#
+#     The surt source is hosted at https://github.com/internetarchive/surt
+
+"""Opt-in timing of the stages of surt().
+
+Pass a StageTimer in the stage_timer option to find out where the time of
+a batch goes:
+
+>>> timer = StageTimer(slow_threshold=0.001)
+>>> keys = surt_many(urls, stage_timer=timer)
+>>> print(timer.report())
+>>> timer.slow_urls   # [(seconds, url, [(stage, seconds), ...]), ...]
+
+The stages are
+
+  parse              handyurl.parse()
+  canonicalize       the whole canonicalizer, made up of
+    google           GoogleURLCanonicalizer.canonicalize(), made up of
+      google.host    user info escaping, host unescaping, idna and ip
+                     address detection
+      google.query   query escaping
+      google.path    path unescaping, normalization and escaping
+    ia               IAURLCanonicalizer.canonicalize(), made up of
+      ia.host        lowercasing and www-stripping of the host, user info
+                     and default port stripping
+      ia.path        path lowercasing and session id stripping
+      ia.query       query session id stripping, lowercasing and sorting
+  output             handyurl.geturl_bytes()
+  url                the whole of surt(), per url
+
+CompositeCanonicalizer records each of its canonicalizers as a stage of
+its own. Without a stage_timer none of this code runs.
+
+A StageTimer keeps the timings of the url in progress, so use one per
+thread.
+"""
+
+from __future__ import absolute_import
+
+import heapq
+
+try:
+    from time import perf_counter as _clock
+except ImportError:
+    from time import time as _clock
+
+class StageTimer(object):
+    """Collects the count and the total time of each stage.
+
+    callback, if given, is called as callback(stage, seconds) for every
+    stage of every url. Urls that take slow_threshold seconds or more are
+    kept in slow_urls, slowest first, at most max_slow_urls of them.
+    """
+    clock = staticmethod(_clock)
+
+    def __init__(self, callback=None, slow_threshold=None, max_slow_urls=100):
+        self.callback = callback
+        self.slow_threshold = slow_threshold
+        self.max_slow_urls = max_slow_urls
+        self.counts = {}
+        self.seconds = {}
+        self._slow = []
+        self._url_stages = None
+        self._seq = 0
+
+    def record(self, stage, seconds):
+        self.counts[stage] = self.counts.get(stage, 0) + 1
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+        if self._url_stages is not None:
+            self._url_stages.append((stage, seconds))
+        if self.callback is not None:
+            self.callback(stage, seconds)
+
+    def start_url(self):
+        """Called by surt() before the stages of a url."""
+        self._url_stages = []
+
+    def end_url(self, url, seconds):
+        """Called by surt() after the stages of a url, with the total time."""
+        stages, self._url_stages = self._url_stages, None
+        self.record('url', seconds)
+        if self.slow_threshold is None or seconds < self.slow_threshold:
+            return
+        # min-heap of the slowest urls; seq breaks ties without comparing urls
+        self._seq += 1
+        item = (seconds, self._seq, url, stages)
+        if len(self._slow) < self.max_slow_urls:
+            heapq.heappush(self._slow, item)
+        elif seconds > self._slow[0][0]:
+            heapq.heapreplace(self._slow, item)
+
+    @property
+    def slow_urls(self):
+        """[(seconds, url, [(stage, seconds), ...]), ...], slowest first"""
+        return [(seconds, url, stages) for seconds, _, url, stages
+                in sorted(self._slow, reverse=True)]
+
+    def stats(self):
+        """{stage: (count, seconds)}"""
+        return dict((stage, (self.counts[stage], self.seconds[stage]))
+                    for stage in self.counts)
+
+    def report(self):
+        """The stats as a table, one line per stage."""
+        lines = ['%-16s %10s %12s %10s' % ('stage', 'count', 'seconds', 'us/call')]
+        for stage in sorted(self.counts):
+            count, seconds = self.counts[stage], self.seconds[stage]
+            lines.append('%-16s %10d %12.6f %10.2f' % (
+                stage, count, seconds, seconds / count * 1e6))
+        return '\n'.join(lines)
+
+    def clear(self):
+        self.counts.clear()
+        self.seconds.clear()
+        self._slow = []
+        self._url_stages = None
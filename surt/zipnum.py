@@ -0,0 +1,322 @@
+#!/usr/bin/env python
+
+# Copyright(c)2012-2013 Internet Archive. Software license AGPL version 3.
+#
+# This file is part of the `surt` python package.
+#
+#     surt is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU Affero General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     surt is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public License
+#     along with surt.  If not, see <http://www.gnu.org/licenses/>.
+#
+#     The surt source is hosted at https://github.com/internetarchive/surt
+
+"""ZipNum clusters: sorted CDX files stored as independent gzip blocks.
+
+A ZipNum cluster is made of
+
+  <name>.cdx.gz  the CDX lines, lines_per_block at a time, each block a
+                 gzip member of its own, so that any block can be
+                 decompressed without the ones before it
+  <name>.idx     the summary: one line per block,
+                 "<urlkey timestamp of its first line>\\t<part>\\t<offset>\\t<length>\\t<number>"
+  <name>.loc     the location of each part: "<part>\\t<path>", with paths
+                 relative to the .loc file
+
+which is the layout of the ZipNum indexes read by the Wayback Machine and
+pywb. The summary is a sorted file itself, so ZipNumIndex bisects it with
+a CDXIndex and decompresses only the blocks that can hold the lines asked
+for.
+
+write_zipnum() builds a cluster from an iterable of sorted lines, with the
+blocks compressed in a pool of threads (zlib releases the GIL while it
+compresses).
+
+Usage: surt-zipnum [options] [input] output.cdx.gz
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import os
+import sys
+import zlib
+import itertools
+import argparse
+import collections
+
+from surt.surt import surt_ranges, _prefixEnd
+from surt.cdxindex import CDXIndex, _toBytes
+
+DEFAULT_LINES_PER_BLOCK = 3000
+
+# write_zipnum()
+#_______________________________________________________________________________
+def write_zipnum(lines, path, lines_per_block=DEFAULT_LINES_PER_BLOCK,
+                 workers=None, compresslevel=6, part=None):
+    """Writes the sorted bytes lines to the ZipNum cluster path (e.g.
+    "index.cdx.gz"), with its summary next to it ("index.idx") and its
+    location file ("index.loc"). " CDX ..." headers, CDXJ "!meta" lines
+    and blank lines are left out. part names the blocks file in the summary and defaults to
+    the base name of path.
+
+    Raises ValueError if the lines are not sorted. With workers=1 the
+    blocks are compressed in this thread; otherwise up to 2 * workers
+    blocks are compressed at a time.
+
+    Returns (lines, blocks).
+    """
+    base = _basePath(path)
+    if part is None:
+        part = os.path.basename(base)
+    summary = []
+    counts = [0, 0]
+    offset = [0]
+
+    with open(path, 'wb') as out:
+        def record(first, n, data):
+            summary.append(b'%s\t%s\t%d\t%d\t%d\n' % (
+                first, part.encode('utf-8'), offset[0], len(data),
+                len(summary) + 1))
+            out.write(data)
+            offset[0] += len(data)
+            counts[0] += n
+            counts[1] += 1
+
+        blocks = _readBlocks(lines, lines_per_block)
+        if workers == 1:
+            for block in blocks:
+                record(_summaryKey(block[0]), len(block),
+                       _compressBlock(block, compresslevel))
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            workers = workers or os.cpu_count() or 1
+            with ThreadPoolExecutor(workers) as executor:
+                pending = collections.deque()
+                for block in blocks:
+                    pending.append((_summaryKey(block[0]), len(block),
+                                    executor.submit(_compressBlock, block,
+                                                    compresslevel)))
+                    if len(pending) >= 2 * workers:
+                        first, n, future = pending.popleft()
+                        record(first, n, future.result())
+                while pending:
+                    first, n, future = pending.popleft()
+                    record(first, n, future.result())
+
+    with open(base + '.idx', 'wb') as f:
+        f.writelines(summary)
+    with open(base + '.loc', 'wb') as f:
+        f.write(b'%s\t%s\n' % (part.encode('utf-8'),
+                               os.path.basename(path).encode('utf-8')))
+    return tuple(counts)
+
+def _basePath(path):
+    for ext in ('.cdx.gz', '.gz'):
+        if path.endswith(ext):
+            return path[:-len(ext)]
+    return path
+
+def _readBlocks(lines, lines_per_block):
+    block = []
+    prev = None
+    for line in lines:
+        if not line.strip() or line.startswith((b' CDX', b'!')):
+            continue
+        if not line.endswith(b'\n'):
+            line += b'\n'
+        if prev is not None and line < prev:
+            raise ValueError('lines are not sorted: %r after %r' % (line, prev))
+        prev = line
+        block.append(line)
+        if len(block) >= lines_per_block:
+            yield block
+            block = []
+    if block:
+        yield block
+
+def _summaryKey(line):
+    """The "urlkey timestamp" of a CDX line"""
+    fields = line.rstrip(b'\r\n').split(b' ', 2)
+    return b' '.join(fields[:2])
+
+def _compressBlock(lines, compresslevel):
+    # wbits 31 writes a gzip header and trailer
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, 31)
+    return compressor.compress(b''.join(lines)) + compressor.flush()
+
+# ZipNumIndex
+#_______________________________________________________________________________
+class ZipNumIndex(object):
+    """A ZipNum cluster, opened by its summary (.idx) file.
+
+    Looks like a CDXIndex: iter_range(), iter_exact(), iter_prefix() and
+    lookup() yield the matching CDX lines as bytes, in order. Blocks that
+    are next to each other in a part are read in one go, up to
+    max_read_blocks at a time.
+    """
+    def __init__(self, idx_path, loc_path=None, max_read_blocks=16):
+        self.summary = CDXIndex(idx_path)
+        self.max_read_blocks = max_read_blocks
+        if loc_path is None:
+            loc_path = _basePath(idx_path)
+            if loc_path.endswith('.idx'):
+                loc_path = loc_path[:-len('.idx')]
+            loc_path += '.loc'
+        self.locations = _readLocations(loc_path)
+        self._files = {}
+
+    def close(self):
+        self.summary.close()
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def iter_range(self, start, end):
+        """Yields the lines with start <= urlkey < end. An end of None means
+        to the end of the index."""
+        start = _toBytes(start)
+        if end is not None:
+            end = _toBytes(end)
+        for line in self._iterBlockLines(start, end):
+            key = line.split(b' ', 1)[0].rstrip(b'\r\n')
+            if key < start:
+                continue
+            if end is not None and key >= end:
+                return
+            yield line
+
+    def iter_exact(self, key):
+        """Yields the lines whose urlkey is key."""
+        key = _toBytes(key)
+        return self.iter_range(key, key + b'\0')
+
+    def iter_prefix(self, prefix):
+        """Yields the lines whose urlkey starts with prefix."""
+        prefix = _toBytes(prefix)
+        if not prefix.rstrip(b'\xff'):
+            return self.iter_range(prefix, None)
+        return self.iter_range(prefix, _prefixEnd(prefix))
+
+    def lookup(self, url, match_type=None, **options):
+        """Yields the lines that match url; see surt_ranges()."""
+        ranges = surt_ranges(_toBytes(url), match_type, **options)
+        return itertools.chain.from_iterable(
+                self.iter_range(start, end) for start, end in ranges)
+
+    def blocks(self, start, end):
+        """Yields (part, offset, length) of the blocks that can hold lines
+        with start <= urlkey < end."""
+        # the block before the first one that starts at start or later may
+        # hold lines of start too, as a run of equal keys can span blocks
+        summary = self.summary
+        offset = summary.previous_line(summary.bisect(start))
+        for line in summary.iter_lines(offset):
+            fields = line.rstrip(b'\r\n').split(b'\t')
+            if end is not None and fields[0].split(b' ', 1)[0] >= end:
+                return
+            yield fields[1], int(fields[2]), int(fields[3])
+
+    def _iterBlockLines(self, start, end):
+        run = []
+        for block in self.blocks(start, end):
+            if run and (block[0] != run[0][0] or len(run) >= self.max_read_blocks
+                        or block[1] != run[-1][1] + run[-1][2]):
+                for line in self._readRun(run):
+                    yield line
+                run = []
+            run.append(block)
+        if run:
+            for line in self._readRun(run):
+                yield line
+
+    def _readRun(self, run):
+        """Reads the adjacent blocks of run at once and yields their lines."""
+        part, offset = run[0][0], run[0][1]
+        length = sum(block[2] for block in run)
+        f = self._open(part)
+        f.seek(offset)
+        data = f.read(length)
+        pos = 0
+        for _, _, block_length in run:
+            lines = zlib.decompress(data[pos:pos+block_length], 31)
+            pos += block_length
+            # every line of a block ends with a newline
+            for line in lines.split(b'\n')[:-1]:
+                yield line + b'\n'
+
+    def _open(self, part):
+        f = self._files.get(part)
+        if f is None:
+            try:
+                path = self.locations[part]
+            except KeyError:
+                raise ValueError('no location for part %r' % part)
+            f = self._files[part] = open(path, 'rb')
+        return f
+
+def _readLocations(loc_path):
+    locations = {}
+    base = os.path.dirname(loc_path)
+    with open(loc_path, 'rb') as f:
+        for line in f:
+            fields = line.rstrip(b'\r\n').split(b'\t')
+            if len(fields) < 2:
+                continue
+            path = fields[1].decode('utf-8')
+            if not os.path.isabs(path):
+                path = os.path.join(base, path)
+            # only the first location of a part is used
+            locations.setdefault(fields[0], path)
+    return locations
+
+# main()
+#_______________________________________________________________________________
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+            prog='surt-zipnum',
+            description='Build a ZipNum cluster from a sorted CDX file.')
+    parser.add_argument('input', nargs='?', default='-',
+                        help='sorted CDX input (default: stdin)')
+    parser.add_argument('output',
+                        help='blocks file to write, e.g. index.cdx.gz; the '
+                             '.idx and .loc files are written next to it')
+    parser.add_argument('-n', '--lines-per-block', type=int,
+                        default=DEFAULT_LINES_PER_BLOCK)
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='number of compression threads (default: '
+                             'number of cpus)')
+    parser.add_argument('-l', '--level', type=int, default=6,
+                        help='gzip compression level')
+    parser.add_argument('-q', '--quiet', action='store_true')
+    args = parser.parse_args(argv)
+
+    stdin = getattr(sys.stdin, 'buffer', sys.stdin)
+    instream = stdin if args.input == '-' else open(args.input, 'rb')
+    try:
+        lines, blocks = write_zipnum(instream, args.output,
+                                     lines_per_block=args.lines_per_block,
+                                     workers=args.workers,
+                                     compresslevel=args.level)
+    finally:
+        if instream is not stdin:
+            instream.close()
+    if not args.quiet:
+        print('surt-zipnum: %d lines in %d blocks' % (lines, blocks),
+              file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import random
+
+import pytest
+
+from surt import surt
+
+CDX_HEADER = b' CDX N b a m s k r M S V g\n'
+
+def _make_cdx_lines(n, seed, header=False):
+    rnd = random.Random(seed)
+    hosts = [b'archive.org', b'www.archive.org', b'web.archive.org',
+             b'archive.org:8080', b'archive-it.org', b'example.com',
+             b'a.example.com', b'b.org']
+    lines = []
+    for _ in range(n):
+        url = b'http://%s/%s' % (rnd.choice(hosts), b'/'.join(
+                rnd.choice([b'a', b'b', b'goo', b'goodies', b'x.html'])
+                for _ in range(rnd.randint(0, 3))))
+        lines.append(b'%s %d %s text/html 200 - - - 0 0 f.warc.gz\n' % (
+                surt(url), rnd.randint(10**13, 10**14 - 1), url))
+    lines.sort()
+    return [CDX_HEADER] + lines if header else lines
+
+def _cdx_key(line):
+    return line.split(b' ', 1)[0]
+
+@pytest.fixture
+def make_cdx_lines():
+    """make_cdx_lines(n, seed, header=False) returns n sorted CDX lines of
+    random urls, the same ones for the same seed, with a " CDX" header
+    line first if header is true."""
+    return _make_cdx_lines
+
+@pytest.fixture
+def cdx_key():
+    """cdx_key(line) returns the urlkey of a CDX line."""
+    return _cdx_key
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import asyncio
+import concurrent.futures
+
+import pytest
+
+import surt
+from surt import aio
+
+URLS = [
+    "http://www.archive.org/",
+    "http://archive.org/goo/?a=2&b&a=1",
+    "filedesc:foo.arc.gz",
+    None,
+    "",
+    "http://192.168.1.254/info/",
+    u"http://bücher.ch:8080?#foo",
+    "http://archive.org/index.php?PHPSESSID=0123456789abcdefghijklemopqrstuv&action=profile;u=4221",
+] * 50
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+def test_surt_batch(chunk_size):
+    expected = surt.surt_many(URLS)
+    assert _run(aio.surt_batch(URLS, chunk_size=chunk_size)) == expected
+    expected = surt.surt_many(URLS, with_scheme=True)
+    assert _run(aio.surt_batch(URLS, chunk_size=chunk_size, max_pending=2,
+                               with_scheme=True)) == expected
+
+def test_surt_batch_none_chunks():
+    # chunks of only None urls get the "-" of the whole batch
+    urls = [None, None, b'http://a.com/', None, b'http://b.com/', None]
+    text_urls = [url and url.decode('ascii') for url in urls]
+    for chunk_size in (1, 2, 3):
+        assert _run(aio.surt_batch(urls, chunk_size=chunk_size)) == (
+                surt.surt_many(urls))
+        assert _run(aio.surt_batch(text_urls, chunk_size=chunk_size)) == (
+                surt.surt_many(text_urls))
+    assert _run(aio.surt_batch([None] * 3, chunk_size=2)) == ['-'] * 3
+
+def test_surt_batch_process_pool():
+    urls = [url.encode('utf-8') for url in URLS if url]
+    with concurrent.futures.ProcessPoolExecutor(2) as executor:
+        assert _run(aio.surt_batch(urls, executor=executor, chunk_size=50,
+                                   trailing_comma=True)) == surt.surt_many(
+                urls, trailing_comma=True)
+
+def test_aiter_surt_backpressure():
+    consumed = []
+    seen = []
+
+    async def produce():
+        for url in URLS:
+            consumed.append(url)
+            yield url
+
+    async def consume():
+        async for key in aio.aiter_surt(produce(), chunk_size=10,
+                                        max_pending=3):
+            # the producer can't be more than max_pending chunks ahead
+            assert len(consumed) <= len(seen) + 4 * 10
+            seen.append(key)
+        return seen
+
+    assert _run(consume()) == surt.surt_many(URLS)
+
+def test_aiter_surt_close():
+    async def first_keys():
+        keys = []
+        gen = aio.aiter_surt(iter(URLS), chunk_size=5, max_pending=4)
+        async for key in gen:
+            keys.append(key)
+            if len(keys) == 3:
+                break
+        await gen.aclose()
+        return keys
+
+    assert _run(first_keys()) == surt.surt_many(URLS[:3])
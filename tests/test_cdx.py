@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, unicode_literals
+
+import io
+
+from surt import cdx
+
+CDX_LINES = [
+    b' CDX N b a m s k r M S V g\n',
+    b'com,example)/ 20140101000000 http://www.example.com/ text/html 200 AAAA - - 512 0 foo.warc.gz\n',
+    b'org,archive)/goo?a=2&b&a=1 20140101000000 http://archive.org/goo/?a=2&b&a=1 text/html 200 BBBB - - 512 512 foo.warc.gz\n',
+    b'dns:archive.org 20140101000000 dns:archive.org text/dns 200 CCCC - - 128 1024 foo.warc.gz\n',
+]
+
+CDXJ_LINES = [
+    b'!meta 0 {"format": "cdxj"}\n',
+    b'com,example)/ 20140101000000 {"url": "http://www.example.com/", "status": "200"}\n',
+    b'org,archive)/goo 20140101000000 {"status": "200", "url": "http://ARCHIVE.org/goo/?b&a"}\n',
+]
+
+def test_rekey_lines_cdx():
+    out = cdx.rekey_lines(CDX_LINES, cdx.CDX, with_scheme=True)
+    assert out[0] == CDX_LINES[0]
+    assert out[1] == b'http://(com,example)/ 20140101000000 http://www.example.com/ text/html 200 AAAA - - 512 0 foo.warc.gz\n'
+    assert out[2] == b'http://(org,archive)/goo?a=1&a=2&b 20140101000000 http://archive.org/goo/?a=2&b&a=1 text/html 200 BBBB - - 512 512 foo.warc.gz\n'
+    assert out[3] == CDX_LINES[3]
+
+def test_rekey_lines_cdxj():
+    out = cdx.rekey_lines(CDXJ_LINES, cdx.CDXJ, trailing_comma=True)
+    assert out[0] == CDXJ_LINES[0]
+    assert out[1] == b'com,example,)/ 20140101000000 {"url": "http://www.example.com/", "status": "200"}\n'
+    assert out[2] == b'org,archive,)/goo?a&b 20140101000000 {"status": "200", "url": "http://ARCHIVE.org/goo/?b&a"}\n'
+
+def test_rekey_lines_fields():
+    # header with the url in a different column; no key recomputed for lines
+    # that are too short to have a url
+    lines = [b'x 20140101000000 foo http://www.example.com/a/\n', b'short\n']
+    out = cdx.rekey_lines(lines, cdx.CDX, key_field=0, url_field=3)
+    assert out == [b'com,example)/a 20140101000000 foo http://www.example.com/a/\n', b'short\n']
+
+def test_rekey_lines_bad_url():
+    # a url that surt() rejects leaves its line as it is
+    lines = [CDX_LINES[1], b'x 20140101000000 http://a.com:99999/ text/html\n',
+             CDX_LINES[2]]
+    assert cdx.rekey_lines(lines) == [
+            cdx.rekey_lines([CDX_LINES[1]])[0], lines[1],
+            cdx.rekey_lines([CDX_LINES[2]])[0]]
+    # whatever the error
+    tab = b'x 20140101000000 \t text/html\n'
+    assert cdx.rekey_lines([tab] + lines) == [tab] + cdx.rekey_lines(lines)
+
+    out = io.BytesIO()
+    stats = cdx.rekey_stream(io.BytesIO(b''.join(lines * 3)), out,
+                             workers=1, chunk_size=2)
+    assert sum(s for _, _, s in stats.values()) == 3
+    assert out.getvalue() == b''.join(cdx.rekey_lines(lines * 3))
+
+def test_rekey_lines_bad_cdxj_url():
+    # blank and non-string urls leave their lines alone too
+    lines = [CDXJ_LINES[1],
+             b'x 20140101000000 {"url": "  "}\n',
+             b'x 20140101000000 {"url": 5}\n',
+             b'x 20140101000000 {"url": ["http://a.com/"]}\n',
+             CDXJ_LINES[2]]
+    out = cdx.rekey_lines(lines, cdx.CDXJ)
+    assert out == [cdx.rekey_lines([CDXJ_LINES[1]], cdx.CDXJ)[0]] + lines[1:4] + [
+            cdx.rekey_lines([CDXJ_LINES[2]], cdx.CDXJ)[0]]
+
+    out = io.BytesIO()
+    cdx.rekey_stream(io.BytesIO(b''.join(lines)), out, workers=1)
+    assert out.getvalue() == b''.join(cdx.rekey_lines(lines, cdx.CDXJ))
+
+def test_detect_format():
+    assert cdx.detect_format(CDX_LINES[1]) == cdx.CDX
+    assert cdx.detect_format(CDXJ_LINES[1]) == cdx.CDXJ
+    assert cdx.parse_cdx_header(CDX_LINES[0]) == (0, 2)
+    assert cdx.parse_cdx_header(b' CDX a b N\n') == (2, 0)
+    assert cdx.parse_cdx_header(CDX_LINES[1]) is None
+
+def test_rekey_stream():
+    lines = CDX_LINES + CDX_LINES[1:] * 20
+    expected = b''.join(cdx.rekey_lines(lines, cdx.CDX, key_field=0, url_field=2))
+    for workers in (1, 2):
+        out = io.BytesIO()
+        stats = cdx.rekey_stream(io.BytesIO(b''.join(lines)), out,
+                                 workers=workers, chunk_size=7)
+        assert out.getvalue() == expected
+        assert sum(n for n, _, _ in stats.values()) == len(lines)
+        assert sum(s for _, _, s in stats.values()) == 0
+
+    out = io.BytesIO()
+    cdx.rekey_stream(io.BytesIO(b''.join(CDXJ_LINES)), out, workers=1)
+    assert out.getvalue() == b''.join(cdx.rekey_lines(CDXJ_LINES, cdx.CDXJ))
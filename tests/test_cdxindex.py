@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+
+import pytest
+
+from surt.cdxindex import CDXIndex
+
+def _write_index(tmpdir, lines, name='index.cdx'):
+    path = tmpdir.join(name)
+    path.write_binary(b''.join(lines))
+    return str(path)
+
+def test_bisect_and_iter_range(tmpdir, make_cdx_lines, cdx_key):
+    lines = make_cdx_lines(2000, 18, header=True)
+    keys = sorted(set(cdx_key(line) for line in lines[1:]))
+    with CDXIndex(_write_index(tmpdir, lines)) as index:
+        assert index.bisect(b'') == 0
+        assert index.bisect(b'~') == index.size
+        for key in keys + [b'org,archive)/go', b'org,archive)/goo/', b'a', b'zz']:
+            assert list(index.iter_exact(key)) == [
+                    line for line in lines[1:] if cdx_key(line) == key]
+            assert list(index.iter_prefix(key)) == [
+                    line for line in lines[1:]
+                    if cdx_key(line).startswith(key)]
+        assert list(index.iter_range(b'org,archive)/a', b'org,archive)/b')) == [
+                line for line in lines[1:]
+                if b'org,archive)/a' <= cdx_key(line) < b'org,archive)/b']
+        # text keys are encoded
+        assert list(index.iter_prefix(u'org,archive)/')) == list(
+                index.iter_prefix(b'org,archive)/'))
+
+def test_lookup(tmpdir, make_cdx_lines, cdx_key):
+    lines = make_cdx_lines(2000, 18, header=True)
+    with CDXIndex(_write_index(tmpdir, lines)) as index:
+        found = list(index.lookup('*.archive.org'))
+        domain = (b'org,archive)', b'org,archive,', b'org,archive:')
+        assert found == [line for line in lines[1:]
+                         if cdx_key(line).startswith(domain)]
+        assert any(cdx_key(line).startswith(b'org,archive:') for line in found)
+        assert found
+        found = list(index.lookup('http://www.example.com/goo/', 'prefix'))
+        assert found == [line for line in lines[1:]
+                         if cdx_key(line).startswith(b'com,example)/goo/')]
+        assert list(index.lookup(b'http://archive.org/a')) == list(
+                index.iter_exact(b'org,archive)/a'))
+
+def test_edge_cases(tmpdir):
+    with CDXIndex(_write_index(tmpdir, [], 'empty.cdx')) as index:
+        assert index.size == 0
+        assert index.bisect(b'a') == 0
+        assert list(index.iter_prefix(b'a')) == []
+
+    # no newline at the end, a line that is only a key, CRLF line endings
+    lines = [b'a 1\r\n', b'b\n', b'b 2\n', b'c 3']
+    with CDXIndex(_write_index(tmpdir, lines, 'odd.cdx')) as index:
+        assert list(index.iter_exact(b'b')) == [b'b\n', b'b 2\n']
+        assert list(index.iter_exact(b'a')) == [b'a 1\r\n']
+        assert list(index.iter_exact(b'c')) == [b'c 3']
+        assert list(index.iter_prefix(b'')) == lines
+        assert index.bisect(b'd') == index.size
+
+@pytest.mark.parametrize("size", [1, 2, 3, 10, 100])
+def test_bisect_small(tmpdir, size):
+    lines = [b'k%04d x\n' % (i * 2) for i in range(size)]
+    with CDXIndex(_write_index(tmpdir, lines)) as index:
+        offsets = [0]
+        for line in lines:
+            offsets.append(offsets[-1] + len(line))
+        for i in range(size * 2 + 2):
+            assert index.bisect(b'k%04d' % i) == offsets[min((i + 1) // 2, size)]
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import random
+
+import pytest
+
+from surt import surt
+from surt.fingerprint import (key_fingerprint, surt_fingerprint,
+        fingerprint_many, key_fingerprint_many, SeenSet)
+
+def test_fingerprint_stable():
+    # these must never change, fingerprints are stored across restarts
+    assert key_fingerprint(b'org,archive)/') == 0x8d547b198ae87d0d
+    assert surt_fingerprint('http://www.archive.org/details/foo') == 0x8d547b5862fc0cf9
+    assert key_fingerprint(u'org,archive)/') == key_fingerprint(b'org,archive)/')
+
+def test_fingerprint_layout():
+    a = surt_fingerprint('http://archive.org/a')
+    b = surt_fingerprint(b'http://WWW.archive.org/b?x=1')
+    c = surt_fingerprint('http://example.com/a')
+    assert a >> 40 == b >> 40 != c >> 40
+    assert a != b and 0 <= a < 1 << 64
+    assert surt_fingerprint('dns:archive.org') == key_fingerprint(b'dns:archive.org')
+
+def test_fingerprint_many():
+    urls = [b'http://archive.org/a', b'http://example.com/', b'', b'filedesc:x']
+    fps = fingerprint_many(urls, with_scheme=True)
+    assert fps.typecode == 'Q'
+    assert list(fps) == [surt_fingerprint(url, with_scheme=True) for url in urls]
+    assert key_fingerprint_many([surt(url) for url in urls]) == fingerprint_many(urls)
+
+def test_SeenSet():
+    rnd = random.Random(23)
+    fps = [rnd.getrandbits(64) for _ in range(20000)]
+    seen = SeenSet(len(fps), error_rate=0.01)
+    assert seen.add_many(fps[:10]) == [True] * 10
+    assert seen.add(fps[0]) is False
+    seen.add_many(fps)
+    assert all(seen.contains_many(fps))
+    assert len(fps) - 100 < len(seen) <= len(fps)
+
+    others = [rnd.getrandbits(64) for _ in range(20000)]
+    false_positives = sum(seen.contains_many(others))
+    assert false_positives < 0.02 * len(others)
+
+    # fingerprints that differ only in their low bits, as on one host
+    host = fps[0] & ~((1 << 40) - 1)
+    fps = [host | i for i in range(1000)]
+    seen = SeenSet(1000, error_rate=0.01)
+    seen.add_many(fps[:500])
+    assert sum(seen.contains_many(fps[500:])) < 20
+
+def test_SeenSet_save_load(tmpdir):
+    seen = SeenSet(1000)
+    seen.add_many(range(0, 1000, 3))
+    path = str(tmpdir.join('seen.bin'))
+    seen.save(path)
+    assert tmpdir.listdir() == [tmpdir.join('seen.bin')]
+    loaded = SeenSet.load(path)
+    assert (loaded.bits, loaded.hashes, len(loaded)) == (
+            seen.bits, seen.hashes, len(seen))
+    assert all(loaded.contains_many(range(0, 1000, 3)))
+    assert loaded.contains_many(range(1, 1000, 3)) == seen.contains_many(
+            range(1, 1000, 3))
+
+    tmpdir.join('bad.bin').write_binary(b'not a seen set at all, no' * 3)
+    with pytest.raises(ValueError):
+        SeenSet.load(str(tmpdir.join('bad.bin')))
+    with open(path, 'rb') as f:
+        tmpdir.join('short.bin').write_binary(f.read()[:-1])
+    with pytest.raises(ValueError):
+        SeenSet.load(str(tmpdir.join('short.bin')))
+
+def test_SeenSet_args():
+    with pytest.raises(ValueError):
+        SeenSet(0)
+    with pytest.raises(ValueError):
+        SeenSet(10, error_rate=1)
+    # 14.4 bits per entry for 1 in 1000
+    assert 1790000 < SeenSet(10**6, error_rate=0.001).nbytes < 1800000
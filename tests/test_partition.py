@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import collections
+
+import pytest
+
+from surt.surt import surt_host_key
+from surt.partition import HashPartitioner, RangePartitioner
+
+URLS = ['http://%s/page%d' % (host, i)
+        for i in range(3)
+        for host in ['www.site%d.com' % n for n in range(300)]
+                    + ['archive.org', 'web.archive.org', 'example.co.uk']]
+
+def test_HashPartitioner():
+    shards = HashPartitioner(['a', 'b', 'c', 'd'])
+    assigned = shards.shard_many(URLS)
+    assert assigned == [shards.shard(url) for url in URLS]
+    # every url of a host goes to the same shard
+    by_host = collections.defaultdict(set)
+    for url, shard in zip(URLS, assigned):
+        by_host[surt_host_key(url)].add(shard)
+    assert all(len(s) == 1 for s in by_host.values())
+    assert shards.shard('http://WWW.site7.com/x?y') == shards.shard(
+            'https://site7.com:443/')
+    counts = collections.Counter(assigned)
+    assert set(counts) == set('abcd')
+    assert min(counts.values()) > len(URLS) / 4 * 0.6
+    # stable across processes: blake2b, not hash()
+    assert HashPartitioner(4).shard_for_key(b'org,archive)') == (
+            HashPartitioner(4).shard_for_key('org,archive)'))
+
+def test_HashPartitioner_consistent():
+    before = HashPartitioner(['a', 'b', 'c', 'd']).shard_many(URLS)
+    after = HashPartitioner(['a', 'b', 'c', 'd', 'e']).shard_many(URLS)
+    moved = [(x, y) for x, y in zip(before, after) if x != y]
+    # only hosts that went to the new shard moved
+    assert all(y == 'e' for _, y in moved)
+    assert len(moved) < len(URLS) / 5 * 1.5
+    with pytest.raises(ValueError):
+        HashPartitioner([])
+
+def test_RangePartitioner():
+    shards = RangePartitioner([b'com,site2', b'org'], ['low', 'mid', 'high'])
+    assert shards.shard('http://www.site1.com/') == 'low'
+    assert shards.shard('http://site250.com/') == 'mid'
+    assert shards.shard('http://archive.org/') == 'high'
+    assert shards.shard_for_key(u'com,site2') == 'mid'
+    with pytest.raises(ValueError):
+        RangePartitioner([b'b', b'a'])
+    with pytest.raises(ValueError):
+        RangePartitioner([b'a'], ['x'])
+
+def test_RangePartitioner_from_sample():
+    shards = RangePartitioner.from_sample(URLS, 4, with_scheme=True)
+    assert len(shards.boundaries) == 3
+    assert all(b.startswith(b'http://(') for b in shards.boundaries)
+    counts = collections.Counter(shards.shard_many(URLS))
+    assert sorted(counts) == [0, 1, 2, 3]
+    assert max(counts.values()) - min(counts.values()) <= 2 * 3
+    assigned = shards.shard_many(sorted(URLS, key=shards.host_key))
+    assert assigned == sorted(assigned)
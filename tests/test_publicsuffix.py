@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, unicode_literals
+
+import random
+import pkgutil
+
+import surt
+from surt.publicsuffix import (PublicSuffixList, get_public_suffix_list,
+                               load_public_suffix_list, registered_domain,
+                               subdomain)
+import surt.publicsuffix
+
+import pytest
+
+_RULES = """
+// ===BEGIN ICANN DOMAINS===
+com
+uk
+co.uk
+*.ck
+!www.ck
+公司.cn
+cn
+// ===END ICANN DOMAINS===
+// ===BEGIN PRIVATE DOMAINS===
+blogspot.com
+// ===END PRIVATE DOMAINS===
+""".splitlines()
+
+@pytest.mark.parametrize("host,parts", [
+    (b'www.amazon.co.uk', (b'www', b'amazon', b'co.uk')),
+    (b'WWW.Amazon.CO.UK', (b'WWW', b'Amazon', b'CO.UK')),
+    (b'co.uk', (b'', b'', b'co.uk')),
+    (b'a.b.foo.ck', (b'a', b'b', b'foo.ck')),
+    (b'www.ck', (b'', b'www', b'ck')),
+    (b'x.www.ck', (b'x', b'www', b'ck')),
+    (b'foo.blogspot.com', (b'foo', b'blogspot', b'com')),
+    (b'example.invalid', (b'example', b'invalid', b'')),
+    (b'localhost', (b'', b'localhost', b'')),
+    (b'1.2.3.4', (b'', b'1.2.3.4', b'')),
+    (b'www.example.com.', (b'www', b'example', b'com')),
+    (b'xn--55qx5d.cn', (b'', b'', b'xn--55qx5d.cn')),
+    (b'foo.xn--55qx5d.cn', (b'', b'foo', b'xn--55qx5d.cn')),
+    ('foo.公司.cn', ('', 'foo', '公司.cn')),
+    ('foo.公司.cn'.encode('utf-8'), (b'', b'foo', '公司.cn'.encode('utf-8'))),
+    ('www.example。com', ('www', 'example', 'com')),
+])
+def test_PublicSuffixList_split(host, parts):
+    psl = PublicSuffixList(_RULES)
+    assert psl.split(host) == parts
+
+def test_PublicSuffixList_private():
+    psl = PublicSuffixList(_RULES, include_private=True)
+    assert psl.registered_domain(b'a.foo.blogspot.com') == b'foo.blogspot.com'
+    assert psl.subdomain(b'a.foo.blogspot.com') == b'a'
+    psl = PublicSuffixList(_RULES)
+    assert psl.registered_domain(b'a.foo.blogspot.com') == b'blogspot.com'
+    assert psl.registered_domain('a.foo.blogspot.com') == 'blogspot.com'
+    assert psl.registered_domain(b'co.uk') == b''
+    assert psl.registered_domain(b'1.2.3.4') == b''
+
+def test_registered_domain():
+    assert registered_domain(b'www.images.amazon.co.uk') == b'amazon.co.uk'
+    assert registered_domain('funky-images.fancy.co.jp') == 'fancy.co.jp'
+    assert subdomain(b'www.images.amazon.co.uk') == b'www.images'
+    assert surt.surt('http://www.images.amazon.co.uk/a', public_suffix=True) \
+        == 'uk,co,amazon)/a'
+    assert surt.surt(b'http://foo.bar.blogspot.com/', public_suffix=True) \
+        == b'com,blogspot)/'
+
+def test_load_public_suffix_list(tmpdir):
+    path = tmpdir.join('public_suffix_list.dat')
+    path.write_text('\n'.join(_RULES + ['example.com']), encoding='utf-8')
+    default = get_public_suffix_list()
+    key = surt.surt('http://a.b.example.com/', public_suffix=True)
+    assert key == 'com,example)/'
+    try:
+        psl = load_public_suffix_list(str(path))
+        assert get_public_suffix_list() is psl
+        assert surt.surt('http://a.b.example.com/', public_suffix=True) \
+            == 'com,example,b)/'
+    finally:
+        surt.publicsuffix._default_list = default
+        surt.hostcache.default_host_cache.clear()
+
+def _host_corpus(rules):
+    rnd = random.Random(10)
+    labels = ['www', 'a', 'Foo', 'xn--abc', 'images', 'co', 'com', 'org',
+              'uk', 'jp', 'ck', 'bücher', '0', '255', 'kawasaki']
+    hosts = []
+    for _ in range(3000):
+        rule = rnd.choice(rules).lstrip('!*.')
+        prefix = [rnd.choice(labels) for _ in range(rnd.randint(0, 3))]
+        hosts.append('.'.join(prefix + [rule]))
+        hosts.append('.'.join(rnd.choice(labels) for _ in range(rnd.randint(1, 4))))
+    hosts += ['1.2.3.4', '1.2.3.256', 'www.example.com.', 'WWW.EXAMPLE.CO.UK',
+              'www.city.kawasaki.jp', 'a.b.kawasaki.jp', 'www.ck', 'a.www.ck']
+    return hosts
+
+def test_registered_domain_tldextract():
+    """Same results as tldextract on its own copy of the list"""
+    tldextract = pytest.importorskip('tldextract')
+    extract = tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None)
+    psl = get_public_suffix_list()
+    data = pkgutil.get_data('surt', 'public_suffix_list.dat').decode('utf-8')
+    rules = [line.split()[0] for line in data.splitlines()
+             if line.strip() and not line.startswith('//')]
+    for host in _host_corpus(rules):
+        expected = extract(host)
+        assert psl.split(host) == (
+                expected.subdomain, expected.domain, expected.suffix), host
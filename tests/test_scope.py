@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import random
+
+import pytest
+
+from surt import surt
+from surt.scope import SurtPrefixMatcher, surt_prefixes
+
+def test_surt_prefixes():
+    assert surt_prefixes('archive.org') == [b'http://(org,archive,']
+    assert surt_prefixes('*.archive.org') == [b'http://(org,archive,']
+    assert surt_prefixes('http://www.archive.org/') == [b'http://(org,archive,']
+    assert surt_prefixes(u'https://archive.org:8443') == [b'https://(org,archive:8443,']
+    assert surt_prefixes('http://archive.org/details/') == [
+            b'http://(org,archive,)/details/']
+    assert surt_prefixes('http://archive.org/details/foo*') == [
+            b'http://(org,archive,)/details/foo']
+    assert surt_prefixes('+http://(org,archive,)/det') == [
+            b'http://(org,archive,)/det']
+    assert surt_prefixes(b'http://(org,') == [b'http://(org,']
+    assert surt_prefixes('archive.org', with_scheme=False,
+                         trailing_comma=False) == [b'org,archive)', b'org,archive,']
+
+def test_SurtPrefixMatcher():
+    scope = SurtPrefixMatcher([
+        'archive.org',
+        'http://archive.org/details/',
+        '+http://(org,archive,)/details/fo',
+        '+http://(com,',
+    ])
+    scope.add('http://example.com/private/', 'exclude')
+    assert len(scope) == 5
+    assert scope.longest_match('http://web.archive.org/web/') == 'archive.org'
+    assert scope.longest_match('https://ARCHIVE.org/') == 'archive.org'
+    assert scope.longest_match('http://archive.org/details/x') == (
+            'http://archive.org/details/')
+    assert scope.longest_match('http://archive.org/details/foo') == (
+            '+http://(org,archive,)/details/fo')
+    assert scope.longest_match('http://archive.org/details') == 'archive.org'
+    assert scope.longest_match('http://example.com/private/a?b') == 'exclude'
+    assert scope.longest_match('http://example.com/privates') == '+http://(com,'
+    assert scope.longest_match('http://archive-it.org/') is None
+    assert scope.longest_match('dns:archive.org') is None
+    assert not scope.matches('http://example.org/')
+    assert scope.match_many(['http://a.com/', 'http://b.org/', None]) == [
+            '+http://(com,', None, None]
+    assert SurtPrefixMatcher(coerce_https=False, rules=['archive.org']
+                             ).longest_match('https://archive.org/') is None
+
+@pytest.mark.parametrize("opts", [
+    {},
+    dict(with_scheme=False, trailing_comma=False),
+])
+def test_SurtPrefixMatcher_longest(opts):
+    rnd = random.Random(24)
+    hosts = ['archive.org', 'www.archive.org', 'web.archive.org', 'a.b.c.org',
+             'archive-it.org', 'example.com', 'b.c.org', 'c.org', 'ex.com:81']
+    paths = ['', '/', '/a', '/a/', '/a/b', '/ab', '/a?x=1', '/a?x=1&y', '/b/']
+    urls = [('http://%s%s' % (host, path)).encode('ascii')
+            for host in hosts for path in paths]
+    key_opts = dict(dict(with_scheme=True, trailing_comma=True), **opts)
+    keys = [surt(url, **key_opts) for url in urls]
+
+    scope = SurtPrefixMatcher(**opts)
+    values = {}
+    # SURT prefixes cut anywhere in the keys
+    for key in rnd.sample(keys, 30):
+        prefix = key[:rnd.randint(0, len(key))]
+        scope.add_prefix(prefix, prefix)
+        values[prefix] = prefix
+    # and plain rules, which override the prefixes they share
+    for rule in rnd.sample(urls, 10) + [b'b.c.org']:
+        scope.add(rule)
+        for prefix in surt_prefixes(rule, **opts):
+            values[prefix] = rule
+
+    for url, key, match in zip(urls, keys, scope.match_many(urls)):
+        candidates = [prefix for prefix in values if key.startswith(prefix)]
+        if candidates:
+            assert match == values[max(candidates, key=len)], url
+        else:
+            assert match is None, url
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import io
+import os
+import random
+
+import pytest
+
+from surt import surt
+from surt import sort
+
+def _make_urls(n=3000, seed=20):
+    rnd = random.Random(seed)
+    hosts = [b'archive.org', b'WWW.archive.org', b'web.archive.org',
+             b'example.com', b'a.example.com:8080', b'b.org']
+    return [b'http://%s/%s?x=%d' % (rnd.choice(hosts),
+            rnd.choice([b'', b'a', b'b/c', b'goo']), rnd.randint(0, 50))
+            for _ in range(n)]
+
+def _sorted(lines, **kwargs):
+    out = io.BytesIO()
+    result = sort.sort_stream(io.BytesIO(b''.join(lines)), out, **kwargs)
+    return out.getvalue(), result
+
+@pytest.mark.parametrize("kwargs", [
+    dict(workers=1),
+    dict(workers=2, chunk_size=100),
+    dict(workers=1, chunk_size=100, memory_limit=20000),
+    dict(workers=1, chunk_size=50, memory_limit=5000, max_merge=3),
+])
+def test_sort_stream(tmpdir, kwargs):
+    urls = _make_urls()
+    expected = sorted(surt(url) + b' ' + url + b'\n' for url in urls)
+    data, (written, runs) = _sorted([url + b'\n' for url in urls],
+                                    tmpdir=str(tmpdir), **kwargs)
+    assert data == b''.join(expected)
+    assert written == len(urls)
+    if 'memory_limit' in kwargs:
+        assert runs > 3
+    else:
+        assert runs == 0
+    assert os.listdir(str(tmpdir)) == []
+
+def test_sort_stream_unique(tmpdir):
+    urls = _make_urls()
+    data, (written, runs) = _sorted(
+            [url + b'\n' for url in urls], workers=1, chunk_size=100,
+            memory_limit=20000, tmpdir=str(tmpdir), unique=True)
+    keys = [line.split(b' ')[0] for line in data.splitlines()]
+    assert keys == sorted(set(surt(url) for url in urls))
+    assert written == len(keys) and runs > 0
+
+def test_sort_stream_fields():
+    # crawl.log-like lines with the url in the fourth field, blank lines
+    lines = [b'2015-01-01T00:00:00Z 200 1234 http://b.org/x - -\n', b'\n',
+             b'2015-01-01T00:00:01Z 200 1234 http://a.org/ - -\r\n']
+    data, _ = _sorted(lines, workers=1, url_field=3, with_scheme=True)
+    assert data == (
+        b'http://(org,a)/ 2015-01-01T00:00:01Z 200 1234 http://a.org/ - -\n'
+        b'http://(org,b)/x 2015-01-01T00:00:00Z 200 1234 http://b.org/x - -\n')
+
+def test_sort_stream_no_url():
+    # a chunk of lines without the url field, and a url surt() rejects,
+    # key as "-" instead of stopping the sort
+    data, _ = _sorted([b'a b\n', b'c\n'], workers=1, url_field=1, chunk_size=1)
+    assert data == b'- c\n' + surt(b'b') + b' a b\n'
+    data, _ = _sorted([b'http://a.com:99999/\n', b'http://b.com/\n'],
+                      workers=1)
+    assert data == b'- http://a.com:99999/\n' + b'com,b)/ http://b.com/\n'
+
+def test_sort_stream_cdx():
+    lines = [
+        b'x 20140101000000 http://www.example.com/b text/html 200 A - - 1 0 f.gz\n',
+        b' CDX N b a m s k r M S V g\n',
+        b'x 20140101000000 http://archive.org/ text/html 200 B - - 1 0 f.gz',
+    ]
+    data, _ = _sorted(lines, workers=1, format=sort.CDX)
+    assert data == (
+        b' CDX N b a m s k r M S V g\n'
+        b'com,example)/b 20140101000000 http://www.example.com/b text/html 200 A - - 1 0 f.gz\n'
+        b'org,archive)/ 20140101000000 http://archive.org/ text/html 200 B - - 1 0 f.gz\n')
+
+def test_sort_stream_cdx_header():
+    # no N field, so the key goes in the first one; the url is the fourth,
+    # after the ip address in the third
+    lines = [
+        b' CDX A b e a m s\n',
+        b'x 20140101000000 1.2.3.4 http://www.example.com/b text/html 200\n',
+        b'x 20140101000000 1.2.3.5 http://archive.org/ text/html 200\n',
+    ]
+    for workers in (1, 2):
+        data, _ = _sorted(lines, workers=workers, format=sort.CDX)
+        assert data == (
+            b' CDX A b e a m s\n'
+            b'com,example)/b 20140101000000 1.2.3.4 http://www.example.com/b text/html 200\n'
+            b'org,archive)/ 20140101000000 1.2.3.5 http://archive.org/ text/html 200\n')
+
+def test_parse_size():
+    assert sort.parse_size('512') == 512
+    assert sort.parse_size('1k') == 1024
+    assert sort.parse_size('1.5G') == 3 << 29
+    assert sort.parse_size('64MB') == 64 << 20
+
+def test_main(tmpdir):
+    urls = _make_urls(500)
+    tmpdir.join('in.txt').write_binary(b''.join(url + b'\n' for url in urls))
+    sort.main(['-j', '1', '-u', '-S', '10K', '-T', str(tmpdir),
+               str(tmpdir.join('in.txt')), str(tmpdir.join('out.txt'))])
+    keys = [line.split(b' ')[0]
+            for line in tmpdir.join('out.txt').read_binary().splitlines()]
+    assert keys == sorted(set(surt(url) for url in urls))
+    assert sorted(os.listdir(str(tmpdir))) == ['in.txt', 'out.txt']
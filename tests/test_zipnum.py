@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import os
+import zlib
+
+import pytest
+
+from surt import zipnum
+
+def _cdxj(line):
+    key, timestamp, url = line.split(b' ')[:3]
+    return b'%s %s {"url": "%s"}\n' % (key, timestamp, url)
+
+@pytest.mark.parametrize("workers,cdxj", [(1, False), (4, False), (2, True)])
+def test_write_zipnum(tmpdir, workers, cdxj, make_cdx_lines):
+    lines = make_cdx_lines(5000, 19)
+    path = str(tmpdir.join('index.cdx.gz'))
+    if cdxj:
+        lines = [_cdxj(line) for line in lines]
+        header = [b'!meta 0 {"format": "cdxj-gzip-1.0"}\n',
+                  b'!meta 1 {"source": "test"}\n']
+    else:
+        header = [b' CDX N b a m s k r M S V g\n']
+    assert zipnum.write_zipnum(header + lines, path, lines_per_block=100,
+                               workers=workers) == (len(lines), 50)
+
+    summary = tmpdir.join('index.idx').read_binary().splitlines()
+    assert len(summary) == 50
+    assert tmpdir.join('index.loc').read_binary() == b'index\tindex.cdx.gz\n'
+    data = tmpdir.join('index.cdx.gz').read_binary()
+    for i, line in enumerate(summary):
+        key, part, offset, length, number = line.split(b'\t')
+        assert part == b'index' and int(number) == i + 1
+        block = zlib.decompress(data[int(offset):int(offset) + int(length)], 31)
+        assert block == b''.join(lines[i*100:(i+1)*100])
+        assert key == b' '.join(lines[i*100].split(b' ')[:2])
+
+def test_write_zipnum_unsorted(tmpdir):
+    with pytest.raises(ValueError):
+        zipnum.write_zipnum([b'b 1\n', b'a 1\n'], str(tmpdir.join('x.cdx.gz')))
+
+def test_ZipNumIndex(tmpdir, make_cdx_lines, cdx_key):
+    lines = make_cdx_lines(5000, 19)
+    path = str(tmpdir.join('index.cdx.gz'))
+    zipnum.write_zipnum(lines, path, lines_per_block=37, workers=2)
+    keys = sorted(set(cdx_key(line) for line in lines))
+
+    with zipnum.ZipNumIndex(str(tmpdir.join('index.idx')),
+                            max_read_blocks=3) as index:
+        for key in keys + [b'org,archive)/go', b'a', b'zz', b'']:
+            assert list(index.iter_exact(key)) == [
+                    line for line in lines if cdx_key(line) == key]
+            assert list(index.iter_prefix(key)) == [
+                    line for line in lines if cdx_key(line).startswith(key)]
+        assert list(index.lookup('*.archive.org')) == [
+                line for line in lines
+                if cdx_key(line).startswith(
+                        (b'org,archive)', b'org,archive,', b'org,archive:'))]
+        # only the blocks that can hold the key are read
+        blocks = list(index.blocks(b'org,archive)/a', b'org,archive)/a\0'))
+        assert 1 <= len(blocks) <= 3
+
+def test_ZipNumIndex_loc(tmpdir, make_cdx_lines):
+    lines = make_cdx_lines(500, 19)
+    subdir = tmpdir.mkdir('blocks')
+    zipnum.write_zipnum(lines, str(subdir.join('part-00000.cdx.gz')),
+                        lines_per_block=50)
+    os.rename(str(subdir.join('part-00000.idx')), str(tmpdir.join('all.idx')))
+    tmpdir.join('all.loc').write_binary(
+            b'part-00000\tblocks/part-00000.cdx.gz\n')
+    with zipnum.ZipNumIndex(str(tmpdir.join('all.idx'))) as index:
+        assert list(index.iter_prefix(b'')) == lines
+
+def test_main(tmpdir, make_cdx_lines):
+    lines = make_cdx_lines(300, 19)
+    tmpdir.join('in.cdx').write_binary(b''.join(lines))
+    zipnum.main(['-q', '-n', '20', str(tmpdir.join('in.cdx')),
+                 str(tmpdir.join('out.cdx.gz'))])
+    with zipnum.ZipNumIndex(str(tmpdir.join('out.idx'))) as index:
+        assert list(index.iter_prefix(b'org,')) == [
+                line for line in lines if line.startswith(b'org,')]